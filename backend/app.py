@@ -1,19 +1,29 @@
 import asyncio
 import uvicorn
 import json
+import logging
 import os
 import sys
 import time
 import random
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import secrets
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
 # Import group2 logic
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from group2.orchestrator import HierarchicalOrchestrator, setup_global_company
 from group2.detector import AnomalyDetector
+from group2.retention import PackageArchive, RetentionManager, RetentionPolicy
+from group2.logio import iter_jsonl_chunks, iter_raw_chunks, tail_offset
+from backend.response_cache import ResponseCache
+from backend.snapshot_scheduler import SnapshotScheduler
+from backend.profiling import Profiler, ProfilerBusy
 
 app = FastAPI()
 
@@ -27,19 +37,74 @@ app.add_middleware(
 )
 
 # Log directory setup
-LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+LOG_DIR = os.environ.get("APP_LOG_DIR") or os.path.join(os.path.dirname(__file__), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 DELIVERY_LOG = os.path.join(LOG_DIR, "deliveries.jsonl")
 ANOMALY_LOG = os.path.join(LOG_DIR, "anomalies.jsonl")
 SNAPSHOT_LOG = os.path.join(LOG_DIR, "global_snapshot.json")
 
-# Instantiate orchestrator with global regions/continents and thousands of nodes
+# Serialized bodies for file-backed endpoints, rebuilt only when the file changes
+response_cache = ResponseCache()
+
+# Orchestrator mutations (sends, snapshot capture) are serialized on one thread so
+# node state is never touched concurrently; file reads/writes get their own pool.
+# Neither runs on the event loop.
+SIM_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sim")
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="log-io")
+NDJSON = "application/x-ndjson"
+
+# Instantiate orchestrator with global regions/continents and thousands of nodes.
+# Nodes are flyweights (no per-node closures, state allocated on first use), so
+# NODES_PER_REGION in the tens of thousands still boots in about a second.
+NODES_PER_REGION = int(os.environ.get("NODES_PER_REGION", "200"))
+_import_started = time.perf_counter()
 orch = HierarchicalOrchestrator(log_dir=LOG_DIR)
+STARTUP = {"nodes": len(orch.nodes), "elapsed_ms": 0.0}
 if not orch.nodes:
-    setup_global_company(orch, nodes_per_region=200)  # 200 nodes per continent
+    STARTUP = setup_global_company(orch, nodes_per_region=NODES_PER_REGION)  # 200 nodes per continent by default
+
+# Snapshots adapt between these bounds to the change rate, aiming for about
+# SNAPSHOT_TARGET_CHANGES changes per snapshot within SNAPSHOT_COST_BUDGET of wall time
+SNAPSHOT_MIN_INTERVAL_S = 5
+SNAPSHOT_MAX_INTERVAL_S = 300
+SNAPSHOT_TARGET_CHANGES = 500
+SNAPSHOT_COST_BUDGET = 0.02
+snapshots = SnapshotScheduler(
+    orch, SIM_EXECUTOR, IO_EXECUTOR,
+    min_interval_s=SNAPSHOT_MIN_INTERVAL_S,
+    max_interval_s=SNAPSHOT_MAX_INTERVAL_S,
+    target_changes=SNAPSHOT_TARGET_CHANGES,
+    cost_budget=SNAPSHOT_COST_BUDGET,
+    on_snapshot=lambda: response_cache.invalidate("snapshot"),
+)
+
+# Delivered packages leave hot node state after RETENTION_TTL_MS (or sooner once
+# more than RETENTION_MAX_HOT_PACKAGES are hot) and move to an on-disk archive
+RETENTION_TTL_MS = 10 * 60 * 1000
+RETENTION_MAX_HOT_PACKAGES = 50000
+RETENTION_SWEEP_S = 30
+retention = RetentionManager(
+    orch,
+    PackageArchive(os.path.join(LOG_DIR, "package_archive.sqlite")),
+    RetentionPolicy(ttl_ms=RETENTION_TTL_MS, max_hot_packages=RETENTION_MAX_HOT_PACKAGES),
+)
+
+# On-demand profiling (GET /admin/profile); runs are capped at PROFILE_MAX_SECONDS
+# and need a matching X-Admin-Token header. Without PROFILE_TOKEN the endpoints are
+# disabled, since CORS lets any page reach this server.
+PROFILE_MAX_SECONDS = 60
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+profiler = Profiler(SIM_EXECUTOR, max_seconds=PROFILE_MAX_SECONDS)
+
+STARTUP["total_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+logging.getLogger(__name__).info("built %d nodes in %.1f ms", STARTUP["nodes"], STARTUP["elapsed_ms"])
 
 # --- API Endpoints ---
 
+@app.get("/startup")
+def startup_stats():
+    return STARTUP
+
 @app.get("/regions")
 def regions():
     # Return region summary: region name, node count, package count, inflight count
@@ -52,43 +117,171 @@ def regions():
             "region": region_id,
             "nodes": len(node_ids),
             "packages": tot_pkgs,
-            "inflight": tot_inflight
+            "inflight": tot_inflight,
+            "archived": retention.archive.region_counts.get(region_id, 0)
         }
     return summary
 
-@app.get("/deliveries")
-def deliveries(limit: int = 200):
+@app.get("/retention")
+def retention_stats():
+    return retention.stats()
+
+@app.get("/packages")
+async def packages(status: str = None, region: str = None, stale_ms: int = None, limit: int = 200):
+    # e.g. ?status=IN_TRANSIT&region=AS or ?status=SENT&stale_ms=300000; served from the
+    # package index, which lives on the sim thread like the rest of node state
+    loop = asyncio.get_running_loop()
+    found = await loop.run_in_executor(SIM_EXECUTOR, lambda: orch.index.query(status, region, stale_ms, max(0, limit)))
+    return {"count": len(found), "packages": found}
+
+@app.get("/packages/{package_id}")
+async def package(package_id: str):
+    # hot state across nodes, falling back to the cold archive; node state is
+    # read on the sim thread so a concurrent retention sweep can't race it
+    loop = asyncio.get_running_loop()
+    found = await loop.run_in_executor(SIM_EXECUTOR, retention.lookup, package_id)
+    if found is None:
+        return JSONResponse({"detail": "unknown package"}, status_code=404)
+    return found
+
+def _read_deliveries(limit):
+    # only the last `limit` lines are read and parsed, however long the log is;
+    # limit <= 0 returns the whole log
     recs = []
-    if os.path.exists(DELIVERY_LOG):
-        try:
-            with open(DELIVERY_LOG, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        recs.append(json.loads(line))
-                    except Exception:
-                        continue
-        except Exception:
-            recs = []
-    recs = recs[-limit:]
+    try:
+        for chunk in iter_jsonl_chunks(DELIVERY_LOG, start=tail_offset(DELIVERY_LOG, limit)):
+            recs.extend(chunk)
+    except Exception:
+        recs = []
+    recs = recs[-limit:] if limit > 0 else recs
     return {"count": len(recs), "recent": recs}
 
-@app.get("/anomalies")
-def anomalies(limit: int = 200):
-    anomaly_log_path = os.path.join(LOG_DIR, "anomalies.jsonl")
-    detector = AnomalyDetector(log_path=anomaly_log_path)
+def _read_anomalies(limit):
+    detector = AnomalyDetector(log_path=ANOMALY_LOG)
     recs = detector.check_anomalies()
-    return {"count": len(recs), "recent": recs[-limit:]}
+    return {"count": len(recs), "recent": recs[-limit:] if limit > 0 else recs}
 
-@app.get("/snapshot")
-def snapshot():
+def _read_snapshot():
     if os.path.exists(SNAPSHOT_LOG):
         with open(SNAPSHOT_LOG, "r") as f:
             return json.load(f)
     return {}
 
+def _iter_anomaly_lines(limit, chunk_bytes=64 * 1024):
+    # anomalies are derived from the sorted log, so a tail needs the whole pass;
+    # the deque keeps memory at O(limit) and limit <= 0 streams everything as found
+    detector = AnomalyDetector(log_path=ANOMALY_LOG)
+    lines = (json.dumps(rec).encode("utf-8") + b"\n" for rec in detector.iter_anomalies())
+    if limit > 0:
+        lines = deque(lines, maxlen=limit)
+    buf, size = [], 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+async def _stream_in_executor(make_iter):
+    """Drive a blocking iterator on IO_EXECUTOR, yielding each item back on the event loop."""
+    loop = asyncio.get_running_loop()
+    it = await loop.run_in_executor(IO_EXECUTOR, make_iter)
+    done = object()
+    # a next() may still be running on the pool when the client disconnects;
+    # the lock makes close() wait for it instead of failing with "already executing"
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(it, done)
+
+    def close():
+        with lock:
+            it.close()
+
+    try:
+        while True:
+            chunk = await loop.run_in_executor(IO_EXECUTOR, step)
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        if hasattr(it, "close"):
+            try:
+                IO_EXECUTOR.submit(close)
+            except RuntimeError:
+                # executor already shut down; nothing else can be driving the iterator
+                it.close()
+
+def _wants_ndjson(request: Request, format: str):
+    return format == "ndjson" or NDJSON in request.headers.get("accept", "")
+
+@app.get("/deliveries")
+def deliveries(request: Request, limit: int = 200, format: str = "json"):
+    if _wants_ndjson(request, format):
+        # raw log lines straight from the file, no parse/re-serialize round trip
+        return StreamingResponse(_stream_in_executor(lambda: iter_raw_chunks(DELIVERY_LOG, tail_offset(DELIVERY_LOG, limit))),
+                                 media_type=NDJSON)
+    return response_cache.respond(request, "deliveries", limit, [DELIVERY_LOG], lambda: _read_deliveries(limit))
+
+@app.get("/anomalies")
+def anomalies(request: Request, limit: int = 200, format: str = "json"):
+    if _wants_ndjson(request, format):
+        return StreamingResponse(_stream_in_executor(lambda: _iter_anomaly_lines(limit)), media_type=NDJSON)
+    return response_cache.respond(request, "anomalies", limit, [ANOMALY_LOG], lambda: _read_anomalies(limit))
+
+@app.get("/snapshot")
+def snapshot(request: Request, stream: bool = False):
+    if stream:
+        # chunked copy of the file as written; snapshots are replaced atomically
+        if not os.path.exists(SNAPSHOT_LOG):
+            return JSONResponse({})
+        return StreamingResponse(_stream_in_executor(lambda: iter_raw_chunks(SNAPSHOT_LOG)), media_type="application/json")
+    return response_cache.respond(request, "snapshot", None, [SNAPSHOT_LOG], _read_snapshot)
+
+@app.post("/snapshot")
+async def take_snapshot(force: bool = False):
+    # joins an in-flight snapshot instead of starting another; no-op when nothing changed
+    return await snapshots.request(force=force)
+
+@app.get("/snapshot/status")
+def snapshot_status():
+    return snapshots.status()
+
+def _admin_denied(request: Request):
+    """Error response for a profiling request that may not run, else None."""
+    if not PROFILE_TOKEN:
+        return JSONResponse({"detail": "profiling is disabled; set PROFILE_TOKEN to enable it"}, status_code=404)
+    if not secrets.compare_digest(request.headers.get("x-admin-token", ""), PROFILE_TOKEN):
+        return JSONResponse({"detail": "invalid admin token"}, status_code=403)
+    return None
+
+@app.get("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 5, mode: str = "sampling", top: int = 30, format: str = "json"):
+    # mode=sampling (all threads, low overhead) or deterministic (cProfile on the sim and event loop threads);
+    # format=collapsed returns flamegraph-ready text instead of JSON
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+    try:
+        result = await profiler.profile(seconds=seconds, mode=mode, top=top)
+    except ProfilerBusy:
+        return JSONResponse({"detail": "a profile is already running", "status": profiler.status()}, status_code=409)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"] + "\n")
+    return result
+
+@app.get("/admin/profile/status")
+def admin_profile_status(request: Request):
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+    return profiler.status()
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
     await ws.accept()
@@ -100,9 +293,12 @@ async def ws_endpoint(ws: WebSocket):
         except Exception:
             pass
 
+    loop = asyncio.get_running_loop()
+
     def orch_cb(msg):
+        # called from the simulation thread; hand the push over to the event loop
         try:
-            asyncio.create_task(push_msg_to_client(msg))
+            loop.call_soon_threadsafe(lambda: asyncio.create_task(push_msg_to_client(msg)))
         except Exception:
             pass
 
@@ -127,11 +323,14 @@ async def ws_endpoint(ws: WebSocket):
 # --- Simulate Deliveries in Background ---
 @app.on_event("startup")
 async def startup_event():
+    loop = asyncio.get_running_loop()
+
     async def simulate_deliveries():
         package_states = ["CREATED", "SENT", "IN_TRANSIT", "RECEIVED", "DELIVERED"]
+        node_ids = list(orch.nodes.keys())  # fixed after startup; don't rebuild per batch
         while True:
-            src = random.choice(list(orch.nodes.keys()))
-            dst = random.choice(list(orch.nodes.keys()))
+            src = random.choice(node_ids)
+            dst = random.choice(node_ids)
             if src != dst:
                 # Send several packages before receiving
                 packages = []
@@ -140,7 +339,7 @@ async def startup_event():
                     for state in package_states[:-1]:  # All states except DELIVERED
                         status = {"status": state}
                         try:
-                            msg = orch.send(src, dst, pkg, status)
+                            msg = await loop.run_in_executor(SIM_EXECUTOR, orch.send, src, dst, pkg, status)
                         except Exception:
                             pass
                         await asyncio.sleep(0.2)
@@ -149,22 +348,29 @@ async def startup_event():
                 for pkg in packages:
                     status = {"status": "DELIVERED"}
                     try:
-                        orch.send(src, dst, pkg, status)
+                        await loop.run_in_executor(SIM_EXECUTOR, orch.send, src, dst, pkg, status)
                     except Exception:
                         pass
                     await asyncio.sleep(0.2)
             await asyncio.sleep(1)
 
-    async def periodic_snapshot():
+    asyncio.create_task(simulate_deliveries())
+    async def retention_sweeps():
         while True:
+            await asyncio.sleep(RETENTION_SWEEP_S)
             try:
-                orch.chandy_lamport_snapshot()
+                # sweeps mutate node state, so they run on the sim thread
+                await loop.run_in_executor(SIM_EXECUTOR, retention.sweep)
             except Exception:
-                pass
-            await asyncio.sleep(60)  # every 60 seconds
+                logging.getLogger(__name__).exception("retention sweep failed")
 
-    asyncio.create_task(simulate_deliveries())
-    asyncio.create_task(periodic_snapshot())
+    asyncio.create_task(snapshots.run())
+    asyncio.create_task(retention_sweeps())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    SIM_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    IO_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
 # --- Mount frontend LAST ---
 FRONTEND_DIST = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
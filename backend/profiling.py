@@ -0,0 +1,179 @@
+import asyncio
+import cProfile
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+class ProfilerBusy(Exception):
+    pass
+
+# thread entry frames that every stack starts with; dropped from sampled stacks
+_BOOTSTRAP = {("threading.py", "_bootstrap"), ("threading.py", "_bootstrap_inner"), ("threading.py", "run")}
+# stdlib frames a parked thread sits in (C-level waits like SimpleQueue.get and
+# lock.acquire have no frame of their own, so their Python caller is the leaf)
+IDLE_LEAVES = {("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("threading.py", "join"),
+               ("queue.py", "get"), ("selectors.py", "select"), ("thread.py", "_worker"),
+               ("threading.py", "_bootstrap"), ("threading.py", "_bootstrap_inner")}
+IDLE = "(idle)"
+_STDLIB = os.path.dirname(threading.__file__)
+
+def _frame_key(code):
+    if not code.co_filename.startswith(_STDLIB):
+        return None
+    return (os.path.basename(code.co_filename), code.co_name)
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _pstats_label(key):
+    filename, line, name = key
+    return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+class Profiler:
+    """
+    Time-boxed, on-demand profiling of a running server; one profile at a time.
+
+    - sampling: a background thread reads sys._current_frames() every
+      interval_s and counts whole stacks for every thread (sim thread, event
+      loop, request worker threads). Overhead is one stack walk per thread per
+      sample, independent of how much code runs in between. Threads parked in
+      a wait (idle pool workers, the event loop in select) are counted per
+      thread as "(idle)" and left out of the top tables.
+    - deterministic: cProfile on the simulation thread (enabled by a task on
+      sim_executor) and on the event loop thread. Exact call counts and times,
+      but it slows those threads down while enabled.
+
+    Both return top-N function tables and collapsed stacks ("a;b;c count")
+    that flamegraph.pl / speedscope load directly. cProfile records only
+    caller -> callee edges, so deterministic collapsed output is two frames deep.
+    """
+
+    def __init__(self, sim_executor, max_seconds=60.0, interval_s=0.005):
+        self.sim_executor = sim_executor
+        self.max_seconds = max_seconds
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.current = None
+
+    def busy(self):
+        return self._lock.locked()
+
+    async def profile(self, seconds=5.0, mode="sampling", top=30):
+        if mode not in ("sampling", "deterministic"):
+            raise ValueError(f"unknown profile mode {mode!r}")
+        seconds = float(seconds)
+        if not math.isfinite(seconds):
+            # nan would slip through min/max and asyncio.sleep(nan) never returns
+            raise ValueError(f"profile duration must be finite, got {seconds!r}")
+        seconds = min(max(seconds, 0.05), self.max_seconds)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy(self.current)
+        self.current = {"mode": mode, "seconds": seconds, "started": time.time()}
+        try:
+            if mode == "sampling":
+                result = await asyncio.to_thread(self._sample, seconds)
+            else:
+                result = await self._deterministic(seconds)
+            result = self._summarize(result, top)
+            self.runs += 1
+        finally:
+            self.current = None
+            self._lock.release()
+        result.update(mode=mode, seconds=seconds)
+        return result
+
+    def _sample(self, seconds):
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                thread = names.get(ident, str(ident))
+                if _frame_key(frame.f_code) in IDLE_LEAVES:
+                    stacks[(thread, IDLE)] += 1
+                    continue
+                labels = []
+                while frame is not None:
+                    if _frame_key(frame.f_code) not in _BOOTSTRAP:
+                        labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                # nothing left but bootstrap frames: the thread target is a C call
+                stacks[(thread, *reversed(labels)) if labels else (thread, IDLE)] += 1
+            samples += 1
+            time.sleep(self.interval_s)
+        return {"stacks": stacks, "samples": samples, "unit": "samples"}
+
+    async def _deterministic(self, seconds):
+        loop = asyncio.get_running_loop()
+        profiles, notes = {}, []
+        sim = cProfile.Profile()
+        await loop.run_in_executor(self.sim_executor, sim.enable)
+        profiles["sim"] = sim
+        loop_prof = cProfile.Profile()
+        try:
+            loop_prof.enable()
+            profiles["loop"] = loop_prof
+        except ValueError as e:
+            # Python 3.12+ allows one active cProfile per process
+            notes.append(f"event loop thread not profiled: {e}")
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            if "loop" in profiles:
+                loop_prof.disable()
+            await loop.run_in_executor(self.sim_executor, sim.disable)
+
+        stacks = Counter()
+        tables = {}
+        for thread, prof in profiles.items():
+            stats = pstats.Stats(prof).stats
+            tables[thread] = stats
+            for callee, (_, _, tt, _, callers) in stats.items():
+                if not callers:
+                    stacks[(thread, _pstats_label(callee))] += int(tt * 1e6)
+                for caller, (_, _, c_tt, _) in callers.items():
+                    stacks[(thread, _pstats_label(caller), _pstats_label(callee))] += int(c_tt * 1e6)
+        return {"stacks": stacks, "pstats": tables, "notes": notes, "unit": "us"}
+
+    def _summarize(self, result, top):
+        stacks = result.pop("stacks")
+        collapsed = "\n".join(f"{';'.join(s)} {n}" for s, n in stacks.most_common() if n > 0)
+        if "pstats" in result:
+            rows = {}
+            for thread, stats in result.pop("pstats").items():
+                for key, (cc, nc, tt, ct, _) in stats.items():
+                    rows[(thread, key)] = {"thread": thread, "function": _pstats_label(key), "ncalls": nc,
+                                           "primitive_calls": cc, "tottime_ms": round(tt * 1000, 3),
+                                           "cumtime_ms": round(ct * 1000, 3)}
+            rows = list(rows.values())
+            by_self = sorted(rows, key=lambda r: r["tottime_ms"], reverse=True)[:top]
+            by_total = sorted(rows, key=lambda r: r["cumtime_ms"], reverse=True)[:top]
+        else:
+            self_counts, total_counts, idle = Counter(), Counter(), Counter()
+            for stack, n in stacks.items():
+                if stack[-1] == IDLE:
+                    idle[stack[0]] += n
+                    continue
+                self_counts[(stack[0], stack[-1])] += n
+                for label in set(stack[1:]):
+                    total_counts[(stack[0], label)] += n
+            samples = max(1, result["samples"])
+            by_self = [{"thread": t, "function": f, "samples": n, "pct": round(100.0 * n / samples, 2)}
+                       for (t, f), n in self_counts.most_common(top)]
+            by_total = [{"thread": t, "function": f, "samples": n, "pct": round(100.0 * n / samples, 2)}
+                        for (t, f), n in total_counts.most_common(top)]
+            result["idle_samples"] = dict(idle.most_common())
+        result.update(top_self=by_self, top_total=by_total, collapsed=collapsed)
+        return result
+
+    def status(self):
+        return {"busy": self.busy(), "current": self.current, "runs": self.runs, "max_seconds": self.max_seconds}
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+from fastapi.responses import Response
+
+class CacheEntry:
+    __slots__ = ("signature", "body", "etag", "_gzipped")
+
+    def __init__(self, signature, body):
+        self.signature = signature
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+class ResponseCache:
+    """
+    Serialized-response cache for endpoints backed by files.
+
+    An entry is reused while the signature of its source files (inode, mtime_ns,
+    size) and its in-process generation counter are unchanged, so an unchanged
+    log or snapshot is parsed and serialized once no matter how often it is polled.
+    Bodies are stored as bytes with a content ETag; gzip variants are built lazily.
+    At most max_entries (name, key) bodies are kept, least recently used evicted
+    first, so clients varying query parameters can't grow memory without bound.
+    """
+
+    def __init__(self, min_gzip_bytes=1024, max_entries=64):
+        self.min_gzip_bytes = min_gzip_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self, name):
+        """Bump the generation for name, forcing entries tagged with it to rebuild."""
+        with self._lock:
+            self._generations[name] += 1
+
+    @staticmethod
+    def file_signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return (path, None)
+        return (path, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _signature(self, name, paths):
+        return (self._generations[name],) + tuple(self.file_signature(p) for p in paths)
+
+    def get(self, name, key, paths, build):
+        """Return the CacheEntry for (name, key), calling build() to produce a JSON-able value on a miss."""
+        sig = self._signature(name, paths)
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is not None:
+                self._entries.move_to_end((name, key))
+        if entry is not None and entry.signature == sig:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        entry = CacheEntry(sig, body)
+        with self._lock:
+            self._entries[(name, key)] = entry
+            self._entries.move_to_end((name, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def respond(self, request, name, key, paths, build, media_type="application/json"):
+        entry = self.get(name, key, paths, build)
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        body = entry.body
+        if len(body) >= self.min_gzip_bytes and "gzip" in request.headers.get("accept-encoding", ""):
+            body = entry.gzipped()
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return etag in tags or ("W/" + etag) in tags
@@ -2,6 +2,10 @@ import time
 import threading
 import json
 import os
+import queue
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 class HybridLogicalClock:
     def __init__(self, offset=0):
@@ -35,6 +39,10 @@ class SimNode:
         self.hlc = HybridLogicalClock(offset)
         self.state = {}
         self.inflight = []
+        # Messages are posted to the mailbox without locking (deque.append is
+        # atomic) and applied in order by whichever thread holds self.lock.
+        self.mailbox = deque()
+        self.lock = threading.Lock()
 
     def send_update(self, target, package, status):
         stamp = self.hlc.now()
@@ -45,24 +53,120 @@ class SimNode:
             "package": package,
             "status": status
         }
-        target.receive_update(msg)
+        target.post(msg)
+        target.drain()
         return msg
 
+    def post(self, msg):
+        self.mailbox.append(msg)
+
+    def drain(self):
+        # Whoever takes the lock applies everything queued so far, including
+        # messages posted by other senders; once we hold it, our own post is done.
+        with self.lock:
+            while True:
+                try:
+                    msg = self.mailbox.popleft()
+                except IndexError:
+                    break
+                self._apply(msg)
+
     def receive_update(self, msg):
+        with self.lock:
+            self._apply(msg)
+
+    def _apply(self, msg):
         self.hlc.update(msg["ts"])
         self.state[msg["package"]] = msg
         self.inflight.append(msg)
 
+    def copy_state(self):
+        with self.lock:
+            return dict(self.state)
+
+class LogWriter:
+    """
+    Append-only JSON-lines writer. Callers serialize and enqueue on a SimpleQueue
+    (no Python lock on the hot path); one background thread drains it and writes
+    in batches. A record that cannot be encoded raises in write(), on the
+    caller's thread, so a bad record never reaches (or stops) the writer thread.
+    """
+
+    def __init__(self, path, batch_size=512):
+        self.path = path
+        self.batch_size = batch_size
+        self.errors = 0
+        self.last_error = None
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        if self._closed:
+            raise ValueError("write to closed LogWriter")
+        self._queue.put(json.dumps(record) + "\n")
+
+    def _run(self):
+        with open(self.path, "a") as f:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                # threading.Event items are flush markers; None stops the writer
+                try:
+                    f.writelines(r for r in batch if isinstance(r, str))
+                    f.flush()
+                except OSError as e:
+                    # keep draining so flush() and close() never hang on a dead thread
+                    self.errors += 1
+                    self.last_error = repr(e)
+                for r in batch:
+                    if isinstance(r, threading.Event):
+                        r.set()
+                if any(r is None for r in batch):
+                    return
+
+    def flush(self, timeout=None):
+        """Block until every record written before this call is on disk; False on timeout."""
+        if self._closed or not self._thread.is_alive():
+            return self._closed
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, wait=True):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        if wait and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 class Orchestrator:
-    def __init__(self, log_dir="backend/logs"):
+    def __init__(self, log_dir="backend/logs", workers=8, flush_timeout_s=5.0):
         self.nodes = {}
-        self.lock = threading.Lock()
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
         self.log_path = os.path.join(log_dir, "deliveries.jsonl")  # <-- fixed name
         open(self.log_path, "w").close()
-        self.ws_listeners = []
+        self.writer = LogWriter(self.log_path)
+        self.flush_timeout_s = flush_timeout_s
+        # stops the writer thread if the orchestrator is dropped without close()
+        self._finalizer = weakref.finalize(self, self.writer.close, False)
+        # listeners are an immutable tuple swapped under ws_lock, so pushes never lock
+        self.ws_listeners = ()
         self.ws_lock = threading.Lock()
+        self.workers = workers
+        self._pool = None
 
     def add_node(self, name, offset=0):
         self.nodes[name] = SimNode(name, offset)
@@ -75,35 +179,59 @@ class Orchestrator:
         self._push_ws(msg)
         return msg
 
+    def send_many(self, sends):
+        """Run (src, dst, package, status) sends concurrently on the worker pool; returns messages in order."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sim-send")
+        sends = list(sends)
+        # one task per worker over a strided slice keeps per-send overhead down
+        n = self.workers
+        futures = [self._pool.submit(lambda part: [self.send(*args) for args in part], sends[i::n]) for i in range(n)]
+        out = [None] * len(sends)
+        for i, f in enumerate(futures):
+            out[i::n] = f.result()
+        return out
+
     def _log(self, msg):
-        with self.lock:
-            with open(self.log_path, "a") as f:
-                f.write(json.dumps(msg) + "\n")
+        self.writer.write(msg)
 
     def _push_ws(self, msg):
-        with self.ws_lock:
-            for cb in list(self.ws_listeners):
-                try:
-                    cb(msg)
-                except Exception:
-                    pass
+        for cb in self.ws_listeners:
+            try:
+                cb(msg)
+            except Exception:
+                pass
 
     def register_ws_listener(self, cb):
         with self.ws_lock:
-            self.ws_listeners.append(cb)
+            self.ws_listeners = self.ws_listeners + (cb,)
 
     def unregister_ws_listener(self, cb):
         with self.ws_lock:
             if cb in self.ws_listeners:
-                self.ws_listeners.remove(cb)
+                self.ws_listeners = tuple(c for c in self.ws_listeners if c is not cb)
 
     def take_snapshot(self):
-        snap = {n: node.state for n, node in self.nodes.items()}
+        snap = {n: node.copy_state() for n, node in self.nodes.items()}
+        if not self.writer.flush(self.flush_timeout_s):
+            raise TimeoutError(f"delivery log not flushed within {self.flush_timeout_s}s")
         snap_path = os.path.join(self.log_dir, "snapshot.json")
         with open(snap_path, "w") as f:
             json.dump(snap, f, indent=2)
         return snap
 
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self.writer.close()
+        self._finalizer.detach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 class AnomalyDetector:
     def __init__(self, log_path):
         self.log_path = log_path
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class SnapshotScheduler:
+    """
+    Runs Chandy-Lamport snapshots off the event loop at an adaptive interval.
+
+    - capture runs on capture_executor (the thread that owns node state), the
+      JSON write on io_executor; the event loop only awaits them
+    - nothing is taken while orch.generation is unchanged (no dirty state)
+    - the interval aims for about target_changes state changes per snapshot,
+      but never lets snapshotting use more than cost_budget of wall time, and
+      stays within [min_interval_s, max_interval_s]
+    - concurrent requests (timer, POST /snapshot) share one in-flight snapshot
+    """
+
+    def __init__(self, orch, capture_executor, io_executor, min_interval_s=5.0, max_interval_s=300.0,
+                 target_changes=500, cost_budget=0.02, on_snapshot=None):
+        self.orch = orch
+        self.capture_executor = capture_executor
+        self.io_executor = io_executor
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.target_changes = target_changes
+        self.cost_budget = cost_budget
+        self.on_snapshot = on_snapshot
+        self.interval_s = max_interval_s
+        self._inflight = None
+        self._last_generation = None
+        self._last_taken = None  # wall time of the last successful capture
+        self._change_rate = 0.0  # EWMA of state changes per second
+        self.taken = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.last_duration_ms = None
+        self.last_capture_ms = None
+        self.last_error = None
+
+    def dirty(self):
+        return self.orch.generation != self._last_generation
+
+    async def request(self, force=False):
+        """
+        Take a snapshot now (or join the one in flight); returns status() plus
+        "outcome" for this request: "taken", "skipped" (nothing changed) or "failed".
+        """
+        if self._inflight is None:
+            if not force and not self.dirty():
+                self.skipped += 1
+                return dict(self.status(), outcome="skipped", joined=False)
+            self._inflight = asyncio.ensure_future(self._take())
+            # cleared when the snapshot finishes, not when this caller stops waiting,
+            # so a cancelled request cannot let a second snapshot start alongside it
+            self._inflight.add_done_callback(self._clear_inflight)
+            joined = False
+        else:
+            self.coalesced += 1
+            joined = True
+        ok = await asyncio.shield(self._inflight)
+        return dict(self.status(), outcome="taken" if ok else "failed", joined=joined)
+
+    def _clear_inflight(self, fut):
+        if self._inflight is fut:
+            self._inflight = None
+
+    async def _take(self):
+        loop = asyncio.get_running_loop()
+        generation = self.orch.generation
+        started = time.perf_counter()
+        try:
+            snap = await loop.run_in_executor(self.capture_executor, self.orch.capture_snapshot)
+            captured = time.perf_counter()
+            await loop.run_in_executor(self.io_executor, self.orch.write_snapshot, snap)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("snapshot failed")
+            return False
+        now = time.time()
+        if self._last_taken is not None and self._last_generation is not None:
+            elapsed = max(now - self._last_taken, 1e-3)
+            rate = (generation - self._last_generation) / elapsed
+            self._change_rate = rate if self.taken <= 1 else 0.5 * self._change_rate + 0.5 * rate
+        self._last_generation = generation
+        self._last_taken = now
+        self.taken += 1
+        self.last_error = None
+        self.last_capture_ms = round((captured - started) * 1000, 1)
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.interval_s = self._next_interval()
+        if self.on_snapshot is not None:
+            self.on_snapshot()
+        return True
+
+    def _next_interval(self):
+        if self._change_rate > 0:
+            wanted = self.target_changes / self._change_rate
+        else:
+            wanted = self.max_interval_s
+        cost_floor = (self.last_duration_ms or 0) / 1000.0 / self.cost_budget if self.cost_budget else 0
+        return min(self.max_interval_s, max(self.min_interval_s, wanted, cost_floor))
+
+    async def run(self):
+        delay = 0.0
+        while True:
+            await asyncio.sleep(delay)
+            outcome = (await self.request())["outcome"]
+            if outcome == "failed":
+                delay = self.max_interval_s  # back off while failing
+            elif outcome == "taken":
+                delay = self.interval_s
+            else:
+                delay = self.min_interval_s  # nothing dirty: check again soon
+
+    def status(self):
+        return {
+            "taken": self.taken,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_duration_ms": self.last_duration_ms,
+            "last_capture_ms": self.last_capture_ms,
+            "staleness_ms": None if self._last_taken is None else int((time.time() - self._last_taken) * 1000),
+            "pending_changes": self.orch.generation - (self._last_generation or 0),
+            "change_rate_per_s": round(self._change_rate, 3),
+            "interval_s": round(self.interval_s, 3),
+        }
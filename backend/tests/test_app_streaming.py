@@ -0,0 +1,76 @@
+import asyncio
+import importlib
+import json
+import os
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # keep the app's node logs out of backend/logs and boot a small company
+    os.environ["APP_LOG_DIR"] = str(tmp_path_factory.mktemp("app_logs"))
+    os.environ["NODES_PER_REGION"] = "2"
+    try:
+        yield importlib.import_module("backend.app")
+    finally:
+        os.environ.pop("APP_LOG_DIR", None)
+        os.environ.pop("NODES_PER_REGION", None)
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    deliveries = tmp_path / "deliveries.jsonl"
+    with open(deliveries, "w") as f:
+        for i in range(50):
+            f.write(json.dumps({"package": f"pkg{i}", "ts": [1000 + i, 0]}) + "\n")
+    anomalies = tmp_path / "anomalies.jsonl"
+    with open(anomalies, "w") as f:
+        for i in range(10):
+            f.write(json.dumps({"ts": [i * 10_000, 0]}) + "\n")  # each gap is a drift anomaly
+    monkeypatch.setattr(app_module, "DELIVERY_LOG", str(deliveries))
+    monkeypatch.setattr(app_module, "ANOMALY_LOG", str(anomalies))
+    app_module.response_cache.invalidate("deliveries")
+    app_module.response_cache.invalidate("anomalies")
+    return TestClient(app_module.app)
+
+def _ndjson(resp):
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(l) for l in resp.text.splitlines()]
+
+def test_deliveries_limit_and_full_export(client):
+    assert [r["package"] for r in client.get("/deliveries?limit=3").json()["recent"]] == ["pkg47", "pkg48", "pkg49"]
+    assert [r["package"] for r in _ndjson(client.get("/deliveries?limit=3&format=ndjson"))] == ["pkg47", "pkg48", "pkg49"]
+    for limit in (0, -1):
+        assert client.get(f"/deliveries?limit={limit}").json()["count"] == 50
+        assert len(_ndjson(client.get(f"/deliveries?limit={limit}", headers={"Accept": "application/x-ndjson"}))) == 50
+
+def test_anomalies_limit_and_full_export(client):
+    assert client.get("/anomalies?limit=0").json()["count"] == 9
+    assert len(_ndjson(client.get("/anomalies?limit=0&format=ndjson"))) == 9
+    tail = _ndjson(client.get("/anomalies?limit=2&format=ndjson"))
+    assert [a["between"][1]["ts"][0] for a in tail] == [80_000, 90_000]
+
+def test_stream_in_executor_closes_iterator_on_disconnect(app_module):
+    closed = threading.Event()
+
+    def lines():
+        try:
+            for i in range(1000):
+                yield b"%d\n" % i
+        finally:
+            closed.set()
+
+    async def scenario():
+        stream = app_module._stream_in_executor(lines)
+        assert [await stream.__anext__() for _ in range(2)] == [b"0\n", b"1\n"]
+        await stream.aclose()  # what Starlette does when the client goes away
+
+    asyncio.run(scenario())
+    assert closed.wait(5)
+
+def test_profile_rejects_non_finite_duration(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "PROFILE_TOKEN", "t")
+    client = TestClient(app_module.app)
+    resp = client.get("/admin/profile?seconds=nan&mode=deterministic", headers={"X-Admin-Token": "t"})
+    assert resp.status_code == 400 and "finite" in resp.json()["detail"]
+    assert client.get("/admin/profile/status", headers={"X-Admin-Token": "t"}).json()["busy"] is False
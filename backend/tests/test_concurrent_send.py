@@ -0,0 +1,41 @@
+import json
+import pytest
+from backend.simulator import LogWriter, Orchestrator
+
+def test_concurrent_sends_keep_state_and_log(tmp_path):
+    with Orchestrator(log_dir=str(tmp_path / "logs"), workers=8) as orch:
+        _send_and_check(orch)
+
+def _send_and_check(orch):
+    names = [f"N{i}" for i in range(4)]
+    for i, n in enumerate(names):
+        orch.add_node(n, offset=i * 100)
+    seen = []
+    orch.register_ws_listener(seen.append)
+
+    sends = [(names[i % 4], names[(i + 1) % 4], f"pkg{i}", "in-transit") for i in range(2000)]
+    msgs = orch.send_many(sends)
+    assert [m["package"] for m in msgs] == [f"pkg{i}" for i in range(2000)]
+
+    snap = orch.take_snapshot()
+    assert sum(len(s) for s in snap.values()) == 2000
+    assert all(f"pkg{i}" in snap[names[(i + 1) % 4]] for i in range(2000))
+    assert all(len(orch.nodes[n].inflight) == 500 for n in names)
+    assert len(seen) == 2000
+
+    with open(orch.log_path) as f:
+        logged = [json.loads(l)["package"] for l in f]
+    assert sorted(logged) == sorted(f"pkg{i}" for i in range(2000))
+
+def test_log_writer_rejects_bad_record_and_keeps_writing(tmp_path):
+    path = tmp_path / "out.jsonl"
+    with LogWriter(str(path)) as writer:
+        writer.write({"n": 1})
+        with pytest.raises(TypeError):
+            writer.write({"n": object()})
+        writer.write({"n": 2})
+        assert writer.flush(timeout=5)
+        assert [json.loads(l)["n"] for l in path.read_text().splitlines()] == [1, 2]
+    assert not writer._thread.is_alive()
+    with pytest.raises(ValueError):
+        writer.write({"n": 3})
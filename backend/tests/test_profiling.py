@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend.profiling import Profiler, ProfilerBusy
+
+def busy_work():
+    return sum(i * i for i in range(200000))
+
+def feed(sim, stop):
+    # short tasks, like sends, so the profiler's enable/disable tasks get a turn
+    while not stop.is_set():
+        sim.submit(busy_work).result()
+
+def test_sampling_and_deterministic_profiles():
+    sim = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sim")
+    prof = Profiler(sim, max_seconds=0.3, interval_s=0.002)
+    stop = threading.Event()
+
+    async def scenario():
+        sampled = await prof.profile(seconds=5, mode="sampling", top=10)  # capped at max_seconds
+        assert sampled["seconds"] == 0.3 and sampled["samples"] > 10
+        assert "busy_work" in sampled["collapsed"]
+        assert any(r["thread"] == "sim_0" and r["function"].startswith("busy_work") for r in sampled["top_total"])
+        # parked threads (ours and any left over by other tests) only show up as idle
+        assert all(sampled["idle_samples"].get(f"parked-{i}") for i in range(20))
+        assert not any(r["function"].startswith(("_worker ", "wait ", "get ")) for r in sampled["top_self"])
+        assert not any("_bootstrap" in r["function"] for r in sampled["top_total"])
+
+        det = await prof.profile(seconds=0.2, mode="deterministic", top=5)
+        assert len(det["top_self"]) == 5
+        assert any(r["thread"] == "sim" and "genexpr" in r["function"] for r in det["top_self"])
+        assert "sim;" in det["collapsed"]
+
+    feeder = threading.Thread(target=feed, args=(sim, stop))
+    parked = [threading.Thread(target=stop.wait, name=f"parked-{i}") for i in range(20)]
+    for t in [feeder, *parked]:
+        t.start()
+    try:
+        asyncio.run(scenario())
+    finally:
+        stop.set()
+        for t in [feeder, *parked]:
+            t.join()
+        sim.shutdown()
+    assert prof.runs == 2 and not prof.busy()
+
+def test_one_profile_at_a_time():
+    prof = Profiler(ThreadPoolExecutor(max_workers=1), max_seconds=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(prof.profile(seconds=0.2))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ProfilerBusy):
+            await prof.profile(seconds=0.1)
+        await first
+        with pytest.raises(ValueError):
+            await prof.profile(mode="bogus")
+        for seconds in ("nan", "inf", "-inf"):
+            with pytest.raises(ValueError):
+                await prof.profile(seconds=float(seconds), mode="deterministic")
+        assert not prof.busy()
+
+    asyncio.run(scenario())
+    assert prof.runs == 1
@@ -0,0 +1,74 @@
+import json
+import os
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from backend.response_cache import ResponseCache
+
+def _client(path, cache, calls):
+    app = FastAPI()
+
+    def build():
+        calls.append(1)
+        with open(path) as f:
+            return json.load(f)
+
+    @app.get("/snap")
+    def snap(request: Request):
+        return cache.respond(request, "snap", None, [path], build)
+
+    return TestClient(app)
+
+def test_cached_until_file_changes(tmp_path):
+    path = str(tmp_path / "snap.json")
+    with open(path, "w") as f:
+        json.dump({"pkg": [1] * 500}, f)
+    cache, calls = ResponseCache(), []
+    client = _client(path, cache, calls)
+
+    r1 = client.get("/snap")
+    etag = r1.headers["etag"]
+    assert r1.json() == {"pkg": [1] * 500}
+    assert client.get("/snap").headers["etag"] == etag
+    assert client.get("/snap", headers={"If-None-Match": etag}).status_code == 304
+    assert len(calls) == 1
+
+    with open(path, "w") as f:
+        json.dump({"pkg": [2]}, f)
+    os.utime(path, ns=(1, 1))
+    r2 = client.get("/snap", headers={"If-None-Match": etag})
+    assert r2.status_code == 200 and r2.json() == {"pkg": [2]}
+    assert len(calls) == 2
+
+    cache.invalidate("snap")
+    client.get("/snap")
+    assert len(calls) == 3
+
+def test_gzip_body(tmp_path):
+    path = str(tmp_path / "snap.json")
+    with open(path, "w") as f:
+        json.dump({"pkg": "x" * 5000}, f)
+    client = _client(path, ResponseCache(min_gzip_bytes=100), [])
+    r = client.get("/snap", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json() == {"pkg": "x" * 5000}
+    raw = client.get("/snap", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+
+def test_entries_are_capped_lru(tmp_path):
+    path = tmp_path / "snap.json"
+    path.write_text("{}")
+    cache = ResponseCache(max_entries=3)
+    calls = []
+    get = lambda key: cache.get("deliveries", key, [str(path)], lambda: calls.append(key) or {})
+    for key in (0, 1, 2):
+        get(key)
+    get(0)  # hit; 0 becomes most recently used
+    get(3)  # evicts 1, the least recently used
+    get(0)
+    get(2)
+    assert calls == [0, 1, 2, 3]
+    get(1)
+    assert calls[-1] == 1
+    for key in range(100, 110):
+        get(key)
+    assert cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 12
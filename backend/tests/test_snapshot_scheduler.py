@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.snapshot_scheduler import SnapshotScheduler
+
+class FakeOrch:
+    def __init__(self):
+        self.generation = 0
+        self.captures = 0
+        self.written = []
+
+    def capture_snapshot(self):
+        self.captures += 1
+        return {"generation": self.generation}
+
+    def write_snapshot(self, snap):
+        self.written.append(snap)
+
+def test_skips_clean_state_and_coalesces():
+    orch = FakeOrch()
+    pool = ThreadPoolExecutor(max_workers=1)
+    sched = SnapshotScheduler(orch, pool, pool, min_interval_s=1, max_interval_s=60, target_changes=100)
+
+    async def scenario():
+        assert (await sched.request())["outcome"] == "taken"
+        assert orch.captures == 1
+        assert (await sched.request())["outcome"] == "skipped"  # nothing changed since
+        assert orch.captures == 1 and sched.skipped == 1
+        orch.generation += 10
+        results = await asyncio.gather(*(sched.request() for _ in range(5)))
+        assert orch.captures == 2 and sched.coalesced == 4
+        assert [r["outcome"] for r in results] == ["taken"] * 5
+        assert [r["joined"] for r in results] == [False] + [True] * 4
+        await sched.request(force=True)
+        assert orch.captures == 3
+
+    asyncio.run(scenario())
+    status = sched.status()
+    assert status["taken"] == 3 and status["pending_changes"] == 0
+    assert status["last_duration_ms"] is not None and status["staleness_ms"] >= 0
+    assert 1 <= status["interval_s"] <= 60
+    pool.shutdown()
+
+def test_failure_is_reported():
+    orch = FakeOrch()
+    orch.write_snapshot = lambda snap: (_ for _ in ()).throw(OSError("disk full"))
+    pool = ThreadPoolExecutor(max_workers=1)
+    sched = SnapshotScheduler(orch, pool, pool)
+    status = asyncio.run(sched.request())
+    assert status["outcome"] == "failed"
+    assert status["failures"] == 1 and "disk full" in status["last_error"]
+    pool.shutdown()
+
+def test_cancelled_request_keeps_snapshot_in_flight():
+    orch = FakeOrch()
+    release = threading.Event()
+    capture = orch.capture_snapshot
+    orch.capture_snapshot = lambda: release.wait(5) and capture()
+    pool = ThreadPoolExecutor(max_workers=2)
+    sched = SnapshotScheduler(orch, pool, pool)
+
+    async def scenario():
+        first = asyncio.ensure_future(sched.request())
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0)
+        # the capture is still running, so this joins it instead of starting another
+        second = asyncio.ensure_future(sched.request(force=True))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await second
+
+    status = asyncio.run(scenario())
+    assert status["joined"] and status["outcome"] == "taken"
+    assert orch.captures == 1 and sched.taken == 1
+    pool.shutdown()
@@ -0,0 +1,17 @@
+import json
+from backend.visualize import plot_delivery
+
+def test_plot_delivery_bins_statuses_and_skips_bogus_timestamps(tmp_path):
+    log = tmp_path / "delivery.jsonl"
+    with open(log, "w") as f:
+        for i in range(300):
+            status = "delayed" if i % 3 == 0 else "in-transit"
+            f.write(json.dumps({"ts": [1_700_000_000_000 + i * 100, 0], "status": status}) + "\n")
+        f.write(json.dumps({"ts": [0, 0], "status": "in-transit"}) + "\n")  # would span back to 1970
+        f.write("not json\n")
+    timeline = plot_delivery(str(log), str(tmp_path / "delivery.png"), bin_ms=1000, chunk_bytes=512)
+    assert timeline.rejected == 1
+    counts = timeline.counts
+    assert counts["delayed"].sum() == 100 and counts["in-transit"].sum() == 200
+    assert counts["delayed"].shape[0] == 30 and timeline.capacity < 1000
+    assert (tmp_path / "delivery.png").exists()
@@ -1,30 +1,69 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import json
 import os
+import sys
 
-def plot_delivery(log_path="backend/logs/delivery.jsonl", out_path="backend/logs/delivery.png"):
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from group2.visualizer import MAX_SPAN_MS, TimeBinnedCounts
+
+STATUS_COLORS = {"in-transit": "blue", "delayed": "orange"}
+
+def plot_delivery(log_path="backend/logs/delivery.jsonl", out_path="backend/logs/delivery.png",
+                  bin_ms=1000, chunk_bytes=4 * 1024 * 1024, time_range_ms=None, max_span_ms=MAX_SPAN_MS):
+    # Streams the log in chunks and bins events per status over time, so memory
+    # depends on the time span covered rather than on the number of deliveries.
+    # Timestamps outside the axis bounds (see TimeBinnedCounts) are skipped and counted.
     if not os.path.exists(log_path):
         print("No log file")
-        return
-    msgs = []
+        return None
+    timeline = TimeBinnedCounts(bin_ms, time_range_ms=time_range_ms, max_span_ms=max_span_ms)
     with open(log_path) as f:
-        for line in f:
-            if line.strip():
-                msgs.append(json.loads(line))
-    if not msgs:
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                break
+            ts, statuses = [], []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    m = json.loads(line)
+                    ts.append(m["ts"][0])
+                    statuses.append(str(m["status"]))
+                except Exception:
+                    continue
+            if not ts:
+                continue
+            ts, statuses = np.asarray(ts, dtype=np.int64), np.asarray(statuses)
+            ok = timeline.accept(ts)
+            if ok is not None and not ok.all():
+                ts, statuses = ts[ok], statuses[ok]
+                if ts.size == 0:
+                    continue
+            idx = timeline.rows(ts)
+            labels, inverse = np.unique(statuses, return_inverse=True)
+            for i, status in enumerate(labels.tolist()):
+                c = np.bincount(idx[inverse == i])
+                timeline.array(status)[:c.size] += c
+    counts = timeline.counts
+    if not counts:
         print("No data to plot")
-        return
-    xs = [m["ts"][0] for m in msgs]
-    ys = [m["package"] for m in msgs]
-    colors = ["blue" if m["status"]=="in-transit" else "orange" if m["status"]=="delayed" else "green" for m in msgs]
+        return None
+    if timeline.rejected:
+        print(f"Skipped {timeline.rejected} deliveries outside the time range {timeline.time_range_ms}")
     plt.figure(figsize=(8,4))
-    plt.scatter(xs, ys, c=colors)
+    for status, c in sorted(counts.items()):
+        xs = (np.arange(c.size) + timeline.lo_bin) * bin_ms
+        plt.plot(xs, c, drawstyle="steps-mid", color=STATUS_COLORS.get(status, "green"), label=status)
     plt.xlabel("Timestamp (ms)")
-    plt.ylabel("Package")
+    plt.ylabel(f"Deliveries per {bin_ms} ms")
     plt.title("Delivery Timeline")
+    plt.legend()
     plt.savefig(out_path)
     plt.close()
     print(f"Saved plot to {out_path}")
+    return timeline
 
 if __name__ == "__main__":
     plot_delivery()
@@ -7,10 +7,17 @@ export default function SnapshotButton(){
   async function onTake(){
     setLoading(true);
     try {
-      const r = await fetch((import.meta.env.VITE_API_URL || "http://localhost:8000") + "/snapshot");
+      // POST asks the backend scheduler for a snapshot; concurrent clicks share one capture
+      const r = await fetch((import.meta.env.VITE_API_URL || "http://localhost:8000") + "/snapshot", {method: "POST"});
       if (!r.ok) throw new Error("Snapshot failed");
       const j = await r.json();
-      toast.success("Snapshot captured", {autoClose:2000});
+      // outcome is for this request; last_error may belong to an earlier snapshot
+      if (j.outcome === "failed") throw new Error(j.last_error || "Snapshot failed");
+      if (j.outcome === "skipped") {
+        toast.info("No changes since the last snapshot", {autoClose:2000});
+      } else {
+        toast.success(`Snapshot captured (${j.last_duration_ms} ms)`, {autoClose:2000});
+      }
       // Optionally open snapshot viewer in new tab or trigger UI update
       console.log("snapshot", j);
     } catch (e){
@@ -25,14 +25,22 @@ class HLCStamp:
         return f"{self.phys}:{self.cnt}@{self.node_id}"
 
 class HLC:
-    def __init__(self, node_id: str, get_physical_ms=now_ms):
+    # offset (ms) skews this clock's physical time; keeping it as data rather than a
+    # per-node closure lets every clock share one get_physical_ms function
+    __slots__ = ("node_id", "get_physical_ms", "offset", "last_phys", "last_cnt")
+
+    def __init__(self, node_id: str, get_physical_ms=now_ms, offset: int = 0):
         self.node_id = node_id
         self.get_physical_ms = get_physical_ms
-        self.last_phys = self.get_physical_ms()
+        self.offset = offset
+        self.last_phys = self.physical_ms()
         self.last_cnt = 0
 
+    def physical_ms(self):
+        return self.get_physical_ms() + self.offset
+
     def now(self):
-        phys = self.get_physical_ms()
+        phys = self.physical_ms()
         if phys > self.last_phys:
             self.last_phys = phys
             self.last_cnt = 0
@@ -42,16 +50,18 @@ class HLC:
         return HLCStamp(self.last_phys, self.last_cnt, self.node_id)
 
     def merge(self, remote: HLCStamp):
-        phys = self.get_physical_ms()
+        phys = self.physical_ms()
         max_phys = max(phys, self.last_phys, remote.phys)
-        if max_phys == phys:
-            # local wall time is max
-            counter = 0 if phys > max(self.last_phys, remote.phys) else max(self.last_cnt, remote.cnt) + 1
+        if max_phys == self.last_phys and max_phys == remote.phys:
+            counter = max(self.last_cnt, remote.cnt) + 1
         elif max_phys == self.last_phys:
-            counter = 0 if self.last_phys > max(phys, remote.phys) else max(self.last_cnt, remote.cnt) + 1
+            counter = self.last_cnt + 1
+        elif max_phys == remote.phys:
+            # remote is ahead: stay strictly after the remote stamp
+            counter = remote.cnt + 1
         else:
-            # remote phys is max
-            counter = 0 if remote.phys > max(phys, self.last_phys) else max(self.last_cnt, remote.cnt) + 1
+            # local wall time is strictly ahead of both
+            counter = 0
 
         self.last_phys = max_phys
         self.last_cnt = counter
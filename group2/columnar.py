@@ -0,0 +1,427 @@
+# group2/columnar.py
+"""
+Compressed columnar archive for deliveries.jsonl.
+
+Sealed byte ranges of the delivery log are converted once into segment files:
+NumPy columns (arrival_ts, hlc_phys, hlc_cnt, latency_ms, applied) plus interned
+src/dst/region/package ids, cut into blocks of block_rows rows and compressed
+per column with a stdlib codec. A JSON footer holds the string tables and the
+block index (byte ranges and arrival_ts min/max per block), so a query only
+decompresses the columns it needs from the blocks its time range overlaps.
+
+Segment layout:
+    MAGIC | block 0 col 0 | block 0 col 1 | ... | footer JSON | footer length (u64 LE) | MAGIC
+
+The archive directory has a manifest.json recording, per source log, how far it
+has been sealed; seal() only converts lines appended since the last run.
+
+Usage:
+    python -m group2.columnar seal backend/logs/deliveries.jsonl --archive backend/logs/columnar
+    python -m group2.columnar latency --archive backend/logs/columnar --by src_region,dst_region
+    python -m group2.columnar applied --archive backend/logs/columnar --by dst_region
+    python -m group2.columnar drift --archive backend/logs/columnar --bin-ms 60000
+"""
+import argparse
+import bz2
+import json
+import lzma
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from .logio import Interner, iter_jsonl_chunks, DEFAULT_CHUNK_BYTES
+
+MAGIC = b"TGSCOL1\n"
+_TRAILER = struct.Struct("<Q")
+
+# column -> dtype; string columns hold ids into the footer table named in STRING_COLUMNS
+COLUMNS = {
+    "arrival_ts": "<i8",
+    "hlc_phys": "<i8",
+    "hlc_cnt": "<i4",
+    "latency_ms": "<i4",  # -1 when the record has none
+    "applied": "u1",
+    "src": "<i4",
+    "dst": "<i4",
+    "src_region": "<i4",
+    "dst_region": "<i4",
+    "package_id": "<i4",
+}
+STRING_COLUMNS = {"src": "node", "dst": "node", "src_region": "region", "dst_region": "region", "package_id": "package"}
+
+CODECS = {
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+}
+
+class SegmentWriter:
+    """Streams delivery records into one segment file, flushing a block every block_rows rows."""
+
+    def __init__(self, path, block_rows=65536, codec="zlib"):
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}")
+        self.path = path
+        self.block_rows = block_rows
+        self.codec = codec
+        self._compress = CODECS[codec][0]
+        self.tables = {"node": Interner(), "region": Interner(), "package": Interner()}
+        self.blocks = []
+        self.rows = 0
+        self._buf = {name: [] for name in COLUMNS}
+        self._f = open(path + ".tmp", "wb")
+        self._f.write(MAGIC)
+
+    def add(self, recs):
+        buf = self._buf
+        strings = {name: [] for name in STRING_COLUMNS}
+        for r in recs:
+            try:
+                h = r["hlc"]
+                phys, cnt = (h["phys"], h.get("cnt", 0)) if isinstance(h, dict) else (h[0], h[1])
+                arrival = int(r["arrival_ts"])
+            except (KeyError, TypeError, IndexError, ValueError):
+                continue
+            buf["arrival_ts"].append(arrival)
+            buf["hlc_phys"].append(phys)
+            buf["hlc_cnt"].append(cnt)
+            lat = r.get("latency_ms")
+            buf["latency_ms"].append(-1 if lat is None else lat)
+            buf["applied"].append(1 if r.get("applied") else 0)
+            for name in STRING_COLUMNS:
+                v = r.get(name)
+                strings[name].append("?" if v is None else str(v))
+        for name, table in STRING_COLUMNS.items():
+            buf[name].extend(self.tables[table].intern_all(strings[name]))
+        while len(buf["arrival_ts"]) >= self.block_rows:
+            self._flush_block(self.block_rows)
+
+    def _flush_block(self, n):
+        if n == 0:
+            return
+        meta = {"rows": n, "columns": {}}
+        for name, dtype in COLUMNS.items():
+            arr = np.asarray(self._buf[name][:n], dtype=dtype)
+            del self._buf[name][:n]
+            if name == "arrival_ts":
+                meta["arrival_ts"] = [int(arr.min()), int(arr.max())]
+            data = self._compress(arr.tobytes())
+            meta["columns"][name] = [self._f.tell(), len(data)]
+            self._f.write(data)
+        self.blocks.append(meta)
+        self.rows += n
+
+    def close(self, source=None):
+        """Write the footer and move the segment into place; returns the footer."""
+        self._flush_block(len(self._buf["arrival_ts"]))
+        footer = {
+            "version": 1,
+            "codec": self.codec,
+            "rows": self.rows,
+            "dtypes": COLUMNS,
+            "tables": {t: interner.names for t, interner in self.tables.items()},
+            "blocks": self.blocks,
+            "source": source,
+        }
+        data = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+        self._f.write(data)
+        self._f.write(_TRAILER.pack(len(data)))
+        self._f.write(MAGIC)
+        self._f.close()
+        os.replace(self.path + ".tmp", self.path)
+        return footer
+
+class Segment:
+    """Read side of a segment file: footer, string tables and per-block column access."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(-(_TRAILER.size + len(MAGIC)), os.SEEK_END)
+            (length,) = _TRAILER.unpack(f.read(_TRAILER.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: not a columnar segment")
+            f.seek(-(_TRAILER.size + len(MAGIC) + length), os.SEEK_END)
+            self.footer = json.loads(f.read(length))
+        self.rows = self.footer["rows"]
+        self.tables = self.footer["tables"]
+        self._decompress = CODECS[self.footer["codec"]][1]
+        self._lookup = {}
+
+    def string_id(self, column, value):
+        table = STRING_COLUMNS[column]
+        if table not in self._lookup:
+            self._lookup[table] = {s: i for i, s in enumerate(self.tables[table])}
+        return self._lookup[table].get(value)
+
+    def block_ids(self, since=None, until=None):
+        """Blocks whose arrival_ts range overlaps [since, until)."""
+        return [i for i, b in enumerate(self.footer["blocks"])
+                if (since is None or b["arrival_ts"][1] >= since) and (until is None or b["arrival_ts"][0] < until)]
+
+    def read(self, names, blocks=None):
+        blocks = range(len(self.footer["blocks"])) if blocks is None else blocks
+        out = {}
+        with open(self.path, "rb") as f:
+            for name in names:
+                dtype = np.dtype(self.footer["dtypes"][name])
+                parts = []
+                for i in blocks:
+                    offset, length = self.footer["blocks"][i]["columns"][name]
+                    f.seek(offset)
+                    parts.append(np.frombuffer(self._decompress(f.read(length)), dtype=dtype))
+                out[name] = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        return out
+
+def _sealable_end(path, size):
+    # byte offset just past the last complete line; a partial line is left for the next seal
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(pos, 64 * 1024)
+            f.seek(pos - step)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos -= step
+    return 0
+
+def _split_points(path, start, end, segment_bytes):
+    # line-aligned cut points so no segment covers much more than segment_bytes
+    points = [start]
+    with open(path, "rb") as f:
+        while end - points[-1] > segment_bytes:
+            f.seek(points[-1] + segment_bytes)
+            f.readline()
+            if f.tell() >= end:
+                break
+            points.append(f.tell())
+    points.append(end)
+    return points
+
+class ColumnarArchive:
+    """
+    Directory of sealed segments plus a manifest. Queries scan only the columns
+    and blocks they need and run vectorized over the concatenated arrays; string
+    ids from different segments are remapped to archive-wide ids first.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"sources": {}, "segments": []}
+        self._segments = {}
+        self.tables = {"node": Interner(), "region": Interner(), "package": Interner()}
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def seal(self, log_path, segment_bytes=256 * 1024 * 1024, block_rows=65536, codec="zlib",
+             chunk_bytes=DEFAULT_CHUNK_BYTES):
+        """Convert the complete lines appended to log_path since the last seal; returns the new segment entries."""
+        key = os.path.abspath(log_path)
+        if not os.path.exists(log_path):
+            return []
+        st = os.stat(log_path)
+        src = self.manifest["sources"].get(key)
+        start = src["offset"] if src else 0
+        if src and (src.get("inode") != st.st_ino or st.st_size < start):
+            start = 0  # log was replaced or truncated: it is a new log
+        end = _sealable_end(log_path, st.st_size)
+        added = []
+        if end > start:
+            points = _split_points(log_path, start, end, segment_bytes)
+            for lo, hi in zip(points, points[1:]):
+                fname = "seg-%06d.col" % len(self.manifest["segments"])
+                writer = SegmentWriter(os.path.join(self.root, fname), block_rows, codec)
+                for recs in iter_jsonl_chunks(log_path, chunk_bytes, start=lo, end=hi):
+                    writer.add(recs)
+                footer = writer.close(source={"path": key, "start": lo, "end": hi})
+                blocks = footer["blocks"]
+                entry = {"file": fname, "source": key, "start": lo, "end": hi, "rows": footer["rows"],
+                         "bytes": os.path.getsize(os.path.join(self.root, fname)),
+                         "arrival_ts": [min(b["arrival_ts"][0] for b in blocks), max(b["arrival_ts"][1] for b in blocks)]
+                         if blocks else None}
+                self.manifest["segments"].append(entry)
+                added.append(entry)
+        self.manifest["sources"][key] = {"offset": end, "inode": st.st_ino}
+        self._save_manifest()
+        return added
+
+    def segment(self, entry):
+        seg = self._segments.get(entry["file"])
+        if seg is None:
+            seg = self._segments[entry["file"]] = Segment(os.path.join(self.root, entry["file"]))
+        return seg
+
+    def scan(self, columns, since=None, until=None, **where):
+        """
+        Concatenated columns for rows with since <= arrival_ts < until matching
+        where (column=value or column=[values] on string columns, applied=bool).
+        String columns come back as archive-wide ids; see self.tables.
+        """
+        columns = list(dict.fromkeys(list(columns) + ["arrival_ts"] + list(where)))
+        parts = {name: [] for name in columns}
+        for entry in self.manifest["segments"]:
+            rng = entry.get("arrival_ts")
+            if rng is None or (since is not None and rng[1] < since) or (until is not None and rng[0] >= until):
+                continue
+            seg = self.segment(entry)
+            wanted = {}
+            for name, value in where.items():
+                if name in STRING_COLUMNS:
+                    values = value if isinstance(value, (list, tuple, set)) else [value]
+                    ids = [i for i in (seg.string_id(name, v) for v in values) if i is not None]
+                    if not ids:
+                        break
+                    wanted[name] = np.asarray(ids, dtype=np.int32)
+                else:
+                    wanted[name] = value
+            else:
+                cols = seg.read(columns, seg.block_ids(since, until))
+                mask = np.ones(len(cols["arrival_ts"]), dtype=bool)
+                if since is not None:
+                    mask &= cols["arrival_ts"] >= since
+                if until is not None:
+                    mask &= cols["arrival_ts"] < until
+                for name, value in wanted.items():
+                    mask &= np.isin(cols[name], value) if name in STRING_COLUMNS else (cols[name] == int(value))
+                for name in columns:
+                    arr = cols[name][mask]
+                    if name in STRING_COLUMNS:
+                        table = STRING_COLUMNS[name]
+                        remap = np.asarray(self.tables[table].intern_all(seg.tables[table]), dtype=np.int32)
+                        arr = remap[arr] if len(remap) else arr
+                    parts[name].append(arr)
+        return {name: np.concatenate(p) if p else np.empty(0, dtype=COLUMNS[name]) for name, p in parts.items()}
+
+    def _groups(self, cols, by):
+        # (group labels, inverse index per row) over the combined string ids
+        key = np.zeros(len(cols["arrival_ts"]), dtype=np.int64)
+        sizes = [max(1, len(self.tables[STRING_COLUMNS[name]].names)) for name in by]
+        for name, size in zip(by, sizes):
+            key = key * size + cols[name]
+        uniq, inverse = np.unique(key, return_inverse=True)
+        labels = []
+        for k in uniq.tolist():
+            parts = []
+            for name, size in reversed(list(zip(by, sizes))):
+                k, i = divmod(k, size)
+                parts.append(self.tables[STRING_COLUMNS[name]].names[i])
+            labels.append(dict(zip(by, reversed(parts))))
+        return labels, inverse
+
+    def latency_percentiles(self, by=("src_region", "dst_region"), qs=(50, 99), since=None, until=None, **where):
+        """Latency percentiles (linear interpolation, like np.percentile) per group."""
+        by = list(by)
+        cols = self.scan(["latency_ms"] + by, since, until, **where)
+        valid = cols["latency_ms"] >= 0
+        cols = {k: v[valid] for k, v in cols.items()}
+        if not len(cols["latency_ms"]):
+            return []
+        labels, inverse = self._groups(cols, by)
+        # one sort over (group, latency) packed into int64 is much cheaper than lexsort
+        packed = np.sort((inverse.astype(np.int64) << 32) | cols["latency_ms"].astype(np.int64))
+        lat = (packed & 0xFFFFFFFF).astype(np.float64)
+        counts = np.bincount(inverse, minlength=len(labels))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        out = [dict(label, count=int(c)) for label, c in zip(labels, counts)]
+        for q in qs:
+            pos = starts + q / 100.0 * (counts - 1)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.ceil(pos).astype(np.int64)
+            vals = lat[lo] + (lat[hi] - lat[lo]) * (pos - lo)
+            for row, v in zip(out, vals.tolist()):
+                row[f"p{q}"] = v
+        return out
+
+    def applied_ratio(self, by=("dst_region",), since=None, until=None, **where):
+        by = list(by)
+        cols = self.scan(["applied"] + by, since, until, **where)
+        if not len(cols["applied"]):
+            return []
+        labels, inverse = self._groups(cols, by)
+        counts = np.bincount(inverse, minlength=len(labels))
+        applied = np.bincount(inverse, weights=cols["applied"], minlength=len(labels))
+        return [dict(label, count=int(c), applied=int(a), ratio=float(a) / c)
+                for label, c, a in zip(labels, counts.tolist(), applied.tolist())]
+
+    def drift_over_time(self, bin_ms=60000, by="dst_region", since=None, until=None, **where):
+        """Per group and time bin: count, mean and max of arrival_ts - hlc_phys (ms)."""
+        cols = self.scan(["hlc_phys", by], since, until, **where)
+        if not len(cols["arrival_ts"]):
+            return {}
+        labels, inverse = self._groups(cols, [by])
+        skew = (cols["arrival_ts"] - cols["hlc_phys"]).astype(np.float64)
+        tbin = cols["arrival_ts"] // bin_ms
+        t0 = int(tbin.min())
+        n_bins = int(tbin.max()) - t0 + 1
+        flat = inverse * n_bins + (tbin - t0)
+        size = len(labels) * n_bins
+        counts = np.bincount(flat, minlength=size)
+        sums = np.bincount(flat, weights=skew, minlength=size)
+        maxes = np.full(size, -np.inf)
+        np.maximum.at(maxes, flat, skew)
+        out = {}
+        for g, label in enumerate(labels):
+            series = []
+            for b in np.nonzero(counts[g * n_bins:(g + 1) * n_bins])[0].tolist():
+                i = g * n_bins + b
+                series.append({"t": (t0 + b) * bin_ms, "count": int(counts[i]),
+                               "mean_ms": float(sums[i] / counts[i]), "max_ms": float(maxes[i])})
+            out[label[by]] = series
+        return out
+
+    def stats(self):
+        segs = self.manifest["segments"]
+        return {
+            "segments": len(segs),
+            "rows": sum(s["rows"] for s in segs),
+            "bytes": sum(s["bytes"] for s in segs),
+            "source_bytes": sum(s["end"] - s["start"] for s in segs),
+            "sources": self.manifest["sources"],
+        }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Columnar archive of deliveries.jsonl.")
+    ap.add_argument("command", choices=["seal", "latency", "applied", "drift", "stats"])
+    ap.add_argument("log", nargs="?", help="deliveries.jsonl to seal")
+    ap.add_argument("--archive", required=True)
+    ap.add_argument("--codec", default="zlib", choices=sorted(CODECS))
+    ap.add_argument("--by", help="comma-separated group columns")
+    ap.add_argument("--since", type=int)
+    ap.add_argument("--until", type=int)
+    ap.add_argument("--bin-ms", type=int, default=60000)
+    args = ap.parse_args(argv)
+
+    archive = ColumnarArchive(args.archive)
+    by = args.by.split(",") if args.by else None
+    if args.command == "seal":
+        if not args.log:
+            ap.error("seal needs a log path")
+        result = {"added": archive.seal(args.log, codec=args.codec), "stats": archive.stats()}
+    elif args.command == "latency":
+        result = archive.latency_percentiles(by or ("src_region", "dst_region"), since=args.since, until=args.until)
+    elif args.command == "applied":
+        result = archive.applied_ratio(by or ("dst_region",), since=args.since, until=args.until)
+    elif args.command == "drift":
+        result = archive.drift_over_time(args.bin_ms, (by or ["dst_region"])[0], since=args.since, until=args.until)
+    else:
+        result = archive.stats()
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
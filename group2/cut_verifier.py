@@ -0,0 +1,350 @@
+# group2/cut_verifier.py
+"""
+Offline consistent-cut verifier for global_snapshot.json.
+
+Per-node logs are loaded into NumPy columns (strings interned to ints) and the
+cut conditions are checked vectorized over every channel at once:
+
+- no orphan receives: every recv inside the cut has its send inside the cut
+- channel state: recorded inflight == sends in the cut that were not received in it
+- node state: each recorded package entry is the newest event for it at that node
+- clock frontier: no event in a node's cut is stamped after the node's recorded HLC
+
+A message is identified by (src, hlc.phys, hlc.cnt), which is unique because a
+node's HLC never repeats a stamp. Chandy-Lamport snapshots carry per-node
+log_offset values that delimit the cut; the older hierarchical format
+(package -> info) has no cut, so only its entries' existence in the logs is checked.
+
+Usage: python -m group2.cut_verifier group2/logs/global_snapshot.json --log-dir group2/logs
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from .logio import Interner, iter_field_chunks, hlc_fields
+
+SEND, RECV = 0, 1
+
+class EventTable:
+    """Column store of node log events; all string columns share one Interner."""
+    COLUMNS = ("owner", "action", "src", "dst", "pkg", "phys", "cnt", "hnode")
+    # scalar fields extract_fields reads straight from a chunk of node log lines
+    FIELDS = {"action": "str", "src": "str", "dst": "str", "phys": "int", "cnt": "int", "node": "str",
+              "package_id": "str"}
+    # line prefix as written by Node._log_event, read in a single regex pass
+    LAYOUT = re.compile(
+        rb'^\{"action": "([^"\\]*)", "src": "([^"\\]*)", "dst": "([^"\\]*)", '
+        rb'"hlc": \{"phys": (-?\d+), "cnt": (-?\d+), "node": "([^"\\]*)"\}, "package_id": "([^"\\]*)"',
+        re.M)
+
+    def __init__(self, strings=None):
+        self.strings = strings or Interner()
+        self._parts = {c: [] for c in self.COLUMNS}
+        self._raw_ids = {}  # raw value (bytes from extract_fields, or str) -> string id
+
+    def _intern(self, values):
+        # only distinct new values go through Python; rows are mapped by dict lookups in C
+        raw = self._raw_ids
+        for v in set(values).difference(raw):
+            raw[v] = self.strings(v.decode() if isinstance(v, bytes) else v)
+        return np.fromiter(map(raw.__getitem__, values), dtype=np.int64, count=len(values))
+
+    def add_columns(self, owner, cols):
+        """Append a chunk given as extract_fields columns (byte strings, int64 arrays)."""
+        action = self._intern(cols["action"])
+        send, recv = self._raw_ids.get(b"send", -1), self._raw_ids.get(b"recv", -1)
+        keep = (action == send) | (action == recv)
+        if not keep.any():
+            return
+        if keep.all():
+            src, dst, pkg, node = cols["src"], cols["dst"], cols["package_id"], cols["node"]
+            phys, cnt = cols["phys"], cols["cnt"]
+        else:
+            idx = np.flatnonzero(keep).tolist()
+            src, dst, pkg, node = ([col[i] for i in idx] for col in (cols["src"], cols["dst"], cols["package_id"], cols["node"]))
+            phys, cnt = np.asarray(cols["phys"])[keep], np.asarray(cols["cnt"])[keep]
+        parts = self._parts
+        parts["owner"].append(np.full(len(src), self.strings(owner), dtype=np.int64))
+        parts["action"].append(np.where(action[keep] == send, SEND, RECV).astype(np.int64))
+        parts["src"].append(self._intern(src))
+        parts["dst"].append(self._intern(dst))
+        parts["pkg"].append(self._intern(pkg))
+        parts["phys"].append(np.asarray(phys, dtype=np.int64))
+        parts["cnt"].append(np.asarray(cnt, dtype=np.int64))
+        parts["hnode"].append(self._intern(node))
+
+    def add_records(self, owner, recs):
+        """Append decoded records (slow path for chunks extract_fields can't read)."""
+        recs = [r for r in recs if r.get("action") in ("send", "recv")]
+        if not recs:
+            return
+        hlcs = [hlc_fields(r) for r in recs]
+        self.add_columns(owner, {
+            "action": [r["action"].encode() for r in recs],  # same raw keys as the fast path
+            "src": [str(r.get("src")) for r in recs],
+            "dst": [str(r.get("dst")) for r in recs],
+            "package_id": [str(r.get("package_id")) for r in recs],
+            "phys": np.asarray([h[0] for h in hlcs], dtype=np.int64),
+            "cnt": np.asarray([h[1] for h in hlcs], dtype=np.int64),
+            "node": [str(h[2]) for h in hlcs],
+        })
+
+    def freeze(self):
+        for c in self.COLUMNS:
+            parts = self._parts[c]
+            setattr(self, c, np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64))
+        self._parts = None
+        return self
+
+    def __len__(self):
+        return len(self.phys)
+
+def load_node_logs(log_dir, offsets=None, strings=None):
+    """
+    Load <node>.log files into an EventTable. offsets maps node_id -> byte length
+    of the log prefix to read; nodes not in offsets are read in full, unless
+    offsets is given, in which case only those nodes are loaded.
+    """
+    table = EventTable(strings)
+    if offsets is not None:
+        nodes = sorted(offsets)
+    else:
+        nodes = sorted(fn[:-4] for fn in os.listdir(log_dir) if fn.endswith(".log"))
+    for node_id in nodes:
+        end = offsets.get(node_id) if offsets is not None else None
+        if end == 0:
+            continue
+        path = os.path.join(log_dir, f"{node_id}.log")
+        for cols, recs in iter_field_chunks(path, EventTable.FIELDS, end=end, layout=EventTable.LAYOUT):
+            if cols is not None:
+                table.add_columns(node_id, cols)
+            else:
+                table.add_records(node_id, recs)
+    return table.freeze()
+
+def _group_ids(*cols):
+    """Dense ids for distinct rows of the given int64 columns."""
+    n = len(cols[0])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    order = np.lexsort(cols[::-1])
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for c in cols:
+        sc = c[order]
+        change[1:] |= sc[1:] != sc[:-1]
+    ids = np.empty(n, dtype=np.int64)
+    ids[order] = np.cumsum(change) - 1
+    return ids, int(change.sum())
+
+def _examples(mask, describe, limit):
+    idx = np.flatnonzero(mask)[:limit]
+    return [describe(int(i)) for i in idx]
+
+def verify_cut(snapshot, log_dir, max_examples=20):
+    """Check a Chandy-Lamport snapshot dict against the node logs in log_dir; returns a report dict."""
+    t_start = time.perf_counter()
+    if "nodes" not in snapshot:
+        return _verify_merged(snapshot, log_dir, max_examples, t_start)
+    nodes = snapshot["nodes"]
+    strings = Interner()
+    for nid in nodes:
+        strings(nid)
+    offsets = {nid: info.get("log_offset") for nid, info in nodes.items()}
+    if any(v is None for v in offsets.values()):
+        # snapshot predates log offsets: treat the whole log as inside the cut
+        offsets = {nid: v for nid, v in offsets.items() if v is not None} or None
+    ev = load_node_logs(log_dir, offsets, strings)
+    S = strings.names
+    n_events = len(ev)
+
+    # recorded channel state, interned into the same id space as the events
+    infl = snapshot.get("inflight", [])
+    r_src, r_dst, r_pkg, r_phys, r_cnt = [], [], [], [], []
+    for m in infl:
+        phys, cnt, _ = hlc_fields({"hlc": m.get("hlc"), "src": m.get("from")})
+        r_src.append(strings(m.get("from")))
+        r_dst.append(strings(m.get("to")))
+        r_pkg.append(strings(m.get("package_id")))
+        r_phys.append(phys)
+        r_cnt.append(cnt)
+    r_src, r_dst, r_pkg, r_phys, r_cnt = (np.asarray(a, dtype=np.int64) for a in (r_src, r_dst, r_pkg, r_phys, r_cnt))
+
+    # one id per message over events + recorded inflight
+    msg_id, n_msgs = _group_ids(np.concatenate([ev.src, r_src]), np.concatenate([ev.phys, r_phys]), np.concatenate([ev.cnt, r_cnt]))
+    ev_msg, rec_msg = msg_id[:n_events], msg_id[n_events:]
+    is_send, is_recv = ev.action == SEND, ev.action == RECV
+    sent = np.zeros(n_msgs, dtype=bool)
+    sent[ev_msg[is_send]] = True
+    received = np.zeros(n_msgs, dtype=bool)
+    received[ev_msg[is_recv]] = True
+    recorded = np.zeros(n_msgs, dtype=bool)
+    recorded[rec_msg] = True
+
+    def describe_event(i):
+        return {"node": S[ev.owner[i]], "action": "send" if ev.action[i] == SEND else "recv",
+                "from": S[ev.src[i]], "to": S[ev.dst[i]], "package_id": S[ev.pkg[i]],
+                "hlc": [int(ev.phys[i]), int(ev.cnt[i])]}
+
+    orphan = is_recv & ~sent[ev_msg]
+
+    # channel state: expected inflight = sent in cut and not received in cut
+    expected = sent & ~received
+    missing_msgs = expected & ~recorded
+    missing = is_send & missing_msgs[ev_msg]
+    unexpected = ~expected[rec_msg]
+
+    def describe_inflight(i):
+        return {"from": S[r_src[i]], "to": S[r_dst[i]], "package_id": S[r_pkg[i]], "hlc": [int(r_phys[i]), int(r_cnt[i])],
+                "reason": "already received" if received[rec_msg[i]] else "send not in cut"}
+
+    # clock frontier per node
+    big = np.iinfo(np.int64).max
+    frontier_phys = np.full(len(S), big, dtype=np.int64)
+    frontier_cnt = np.full(len(S), big, dtype=np.int64)
+    for nid, info in nodes.items():
+        h = info.get("hlc")
+        if isinstance(h, dict):
+            frontier_phys[strings.ids[nid]], frontier_cnt[strings.ids[nid]] = h["phys"], h["cnt"]
+    fp, fc = frontier_phys[ev.owner], frontier_cnt[ev.owner]
+    ahead = (ev.phys > fp) | ((ev.phys == fp) & (ev.cnt > fc))
+
+    # recorded node state as columns
+    s_owner, s_pkg, s_phys, s_cnt, s_hnode = [], [], [], [], []
+    for nid, info in nodes.items():
+        o = strings.ids[nid]
+        for pkg, entry in (info.get("state") or {}).items():
+            h = entry.get("hlc") or [-1, -1]
+            s_owner.append(o)
+            s_pkg.append(strings(pkg))
+            s_phys.append(h[0])
+            s_cnt.append(h[1])
+            s_hnode.append(strings(entry.get("node", nid)))
+    s_owner, s_pkg, s_phys, s_cnt, s_hnode = (np.asarray(a, dtype=np.int64) for a in (s_owner, s_pkg, s_phys, s_cnt, s_hnode))
+
+    # newest event per (owner, pkg), ordered like HLCStamp.__lt__ (phys, cnt, node id)
+    if n_events:
+        ranks = strings.ranks()
+        order = np.lexsort((ranks[ev.hnode], ev.cnt, ev.phys, ev.pkg, ev.owner))
+        o_owner, o_pkg = ev.owner[order], ev.pkg[order]
+        last = np.ones(n_events, dtype=bool)
+        last[:-1] = (o_owner[1:] != o_owner[:-1]) | (o_pkg[1:] != o_pkg[:-1])
+        newest = order[last]
+    else:
+        newest = np.zeros(0, dtype=np.int64)
+    k = len(newest)
+    gid, n_groups = _group_ids(np.concatenate([ev.owner[newest], s_owner]), np.concatenate([ev.pkg[newest], s_pkg]))
+    newest_for_group = np.full(n_groups, -1, dtype=np.int64)
+    newest_for_group[gid[:k]] = newest
+    i = newest_for_group[gid[k:]]
+    no_event = i < 0
+    j = np.where(no_event, 0, i)
+    state_mismatch = no_event | (~no_event & ((ev.phys[j] != s_phys) | (ev.cnt[j] != s_cnt) | (ev.hnode[j] != s_hnode)))
+    has_state = np.zeros(n_groups, dtype=bool)
+    has_state[gid[k:]] = True
+    node_ids = np.asarray([strings.ids[nid] for nid in nodes], dtype=np.int64)
+    state_missing = ~has_state[gid[:k]] & np.isin(ev.owner[newest], node_ids)
+    archived = snapshot.get("archived") or {}
+    if archived.get("path") and os.path.exists(archived["path"]) and state_missing.any():
+        # packages moved to the cold archive by retention are expected to be absent
+        from .retention import PackageArchive
+        archive = PackageArchive(archived["path"])
+        cold = np.asarray([strings.ids[p] for p in archive.iter_ids() if p in strings.ids], dtype=np.int64)
+        archive.close()
+        state_missing &= ~np.isin(ev.pkg[newest], cold)
+
+    def describe_state(x):
+        d = {"node": S[s_owner[x]], "package_id": S[s_pkg[x]], "hlc": [int(s_phys[x]), int(s_cnt[x])]}
+        if no_event[x]:
+            d["reason"] = "no event in cut"
+        else:
+            d["reason"] = "not newest event"
+            d["expected"] = describe_event(int(i[x]))
+        return d
+
+    def describe_missing(x):
+        e = describe_event(int(newest[x]))
+        return {"node": e["node"], "package_id": e["package_id"], "hlc": e["hlc"]}
+
+    violations = {
+        "orphan_receives": int(orphan.sum()),
+        "inflight_missing": int(missing.sum()),
+        "inflight_unexpected": int(unexpected.sum()),
+        "clock_ahead_of_frontier": int(ahead.sum()),
+        "state_mismatch": int(state_mismatch.sum()),
+        "state_missing": int(state_missing.sum()),
+    }
+    # per-channel breakdown of channel-state violations
+    channels = {}
+    for mask, src, dst, kind in ((missing, ev.src, ev.dst, "missing"), (unexpected, r_src, r_dst, "unexpected")):
+        if mask.any():
+            pairs, counts = np.unique(np.column_stack([src[mask], dst[mask]]), axis=0, return_counts=True)
+            for (a, b), c in zip(pairs, counts):
+                channels.setdefault(f"{S[a]}->{S[b]}", {})[kind] = int(c)
+    return {
+        "ok": not any(violations.values()),
+        "format": "chandy_lamport",
+        "events": n_events,
+        "messages": n_msgs,
+        "nodes": len(nodes),
+        "state_entries": len(s_owner),
+        "inflight_recorded": len(infl),
+        "violations": violations,
+        "channels": channels,
+        "examples": {
+            "orphan_receives": _examples(orphan, describe_event, max_examples),
+            "inflight_missing": _examples(missing, describe_event, max_examples),
+            "inflight_unexpected": _examples(unexpected, describe_inflight, max_examples),
+            "clock_ahead_of_frontier": _examples(ahead, describe_event, max_examples),
+            "state_mismatch": _examples(state_mismatch, describe_state, max_examples),
+            "state_missing": _examples(state_missing, describe_missing, max_examples),
+        },
+        "elapsed_ms": round((time.perf_counter() - t_start) * 1000, 1),
+    }
+
+def _verify_merged(merged, log_dir, max_examples, t_start):
+    strings = Interner()
+    ev = load_node_logs(log_dir, None, strings)
+    known = set(zip(ev.pkg.tolist(), ev.phys.tolist(), ev.cnt.tolist()))
+    unknown = []
+    n_unknown = 0
+    for pkg, info in merged.items():
+        h = info.get("hlc") or [None, None]
+        if (strings.ids.get(pkg), h[0], h[1]) not in known:
+            n_unknown += 1
+            if len(unknown) < max_examples:
+                unknown.append({"package_id": pkg, "hlc": list(h), "node": info.get("node")})
+    return {
+        "ok": n_unknown == 0,
+        "format": "merged",
+        "events": len(ev),
+        "state_entries": len(merged),
+        "violations": {"state_unknown_event": n_unknown},
+        "examples": {"state_unknown_event": unknown},
+        "elapsed_ms": round((time.perf_counter() - t_start) * 1000, 1),
+    }
+
+def verify_snapshot_file(snapshot_path, log_dir=None, max_examples=20):
+    log_dir = log_dir or os.path.dirname(snapshot_path)
+    with open(snapshot_path) as f:
+        snapshot = json.load(f)
+    return verify_cut(snapshot, log_dir, max_examples)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Verify that a global snapshot is a consistent cut of the node logs.")
+    ap.add_argument("snapshot", help="path to global_snapshot.json")
+    ap.add_argument("--log-dir", help="directory with <node>.log files (default: snapshot's directory)")
+    ap.add_argument("--max-examples", type=int, default=20)
+    args = ap.parse_args(argv)
+    report = verify_snapshot_file(args.snapshot, args.log_dir, args.max_examples)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
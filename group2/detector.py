@@ -1,5 +1,6 @@
 import json
 import os
+from .logio import iter_jsonl_chunks
 
 class AnomalyDetector:
     def __init__(self, log_path="group2/logs/anomalies.jsonl", drift_threshold=2000):
@@ -25,22 +26,22 @@ class AnomalyDetector:
         return None
 
     def check_anomalies(self):
-        anomalies = []
+        return list(self.iter_anomalies())
+
+    def iter_anomalies(self):
+        """Yield anomalies one at a time; only ts-stamped records are held in memory for sorting."""
         if not os.path.exists(self.log_path):
-            return anomalies
-        with open(self.log_path) as f:
-            lines = f.readlines()
-        msgs = [json.loads(l) for l in lines if l.strip()]
-        # Only sort if "ts" is present
-        msgs_with_ts = [m for m in msgs if "ts" in m]
+            return
+        msgs_with_ts = []
+        for recs in iter_jsonl_chunks(self.log_path):
+            msgs_with_ts.extend(m for m in recs if isinstance(m, dict) and "ts" in m)
         msgs_with_ts.sort(key=lambda m: (m["ts"][0], m["ts"][1]))
         for i in range(1, len(msgs_with_ts)):
             prev, curr = msgs_with_ts[i-1], msgs_with_ts[i]
             if curr["ts"][0] < prev["ts"][0]:
-                anomalies.append({"type": "out-of-order", "at": curr})
+                yield {"type": "out-of-order", "at": curr}
             if abs(curr["ts"][0] - prev["ts"][0]) > self.drift_threshold:
-                anomalies.append({"type": "drift", "between": [prev, curr]})
-        return anomalies
+                yield {"type": "drift", "between": [prev, curr]}
 
     def check_out_of_order(self, stored_hlc, received_hlc, package_id):
         if (received_hlc["phys"], received_hlc["cnt"]) < (stored_hlc["phys"], stored_hlc["cnt"]):
@@ -0,0 +1,135 @@
+# group2/index.py
+"""
+Incrementally maintained secondary indexes over package state.
+
+Nodes report every state change (Node.send, applied Node.receive) to the
+orchestrator's PackageIndex. For each package the index keeps the newest update
+by HLC, like the retention sweep does, so status and region describe where the
+package currently stands. Queries such as "IN_TRANSIT into AS" or "SENT for more
+than 5 minutes" then cost O(result) instead of a scan over every node's state.
+"""
+from collections import OrderedDict
+
+from .clock import now_ms
+
+class PackageIndex:
+    """
+    package -> newest (hlc, status, node, region), plus
+    - by_status: status -> set of packages
+    - by_region: region of the node holding the newest state -> set of packages
+    - recency: OrderedDict of packages, least recently updated first, so stale
+      packages are a prefix of it
+
+    Update times come from time_ms (the orchestrator's unskewed time source),
+    not from HLC phys, which carries each node's clock offset.
+    Not thread-safe: mutate and query from the thread that drives sends.
+    """
+
+    def __init__(self, node_region, time_ms=now_ms):
+        self.node_region = node_region
+        self.time_ms = time_ms
+        self.entries = {}
+        self.by_status = {}
+        self.by_region = {}
+        self.recency = OrderedDict()  # package_id -> updated_ms
+
+    def update(self, package_id, hlc, payload, node_id):
+        """Record a state change on node_id; ignored if an entry with a newer HLC exists."""
+        cur = self.entries.get(package_id)
+        # on ties the later report wins, so a receive beats the send that produced it
+        if cur is not None and tuple(hlc) < cur["hlc"]:
+            return False
+        status = (payload or {}).get("status") if isinstance(payload, dict) else None
+        region = self.node_region.get(node_id)
+        if cur is not None:
+            self._unlink(package_id, cur)
+        updated_ms = self.time_ms()
+        self.entries[package_id] = {"hlc": tuple(hlc), "status": status, "node": node_id,
+                                    "region": region, "updated_ms": updated_ms}
+        if status is not None:
+            self.by_status.setdefault(status, set()).add(package_id)
+        if region is not None:
+            self.by_region.setdefault(region, set()).add(package_id)
+        self.recency[package_id] = updated_ms
+        self.recency.move_to_end(package_id)
+        return True
+
+    def _unlink(self, package_id, entry):
+        for table, key in ((self.by_status, entry["status"]), (self.by_region, entry["region"])):
+            members = table.get(key)
+            if members is not None:
+                members.discard(package_id)
+                if not members:
+                    del table[key]
+
+    def discard(self, package_id):
+        entry = self.entries.pop(package_id, None)
+        if entry is not None:
+            self._unlink(package_id, entry)
+            self.recency.pop(package_id, None)
+
+    def get(self, package_id):
+        entry = self.entries.get(package_id)
+        return None if entry is None else self._record(package_id, entry)
+
+    def _record(self, package_id, entry):
+        return {"package_id": package_id, "status": entry["status"], "region": entry["region"],
+                "node": entry["node"], "hlc": list(entry["hlc"]), "updated_ms": entry["updated_ms"]}
+
+    def _stale(self, stale_ms):
+        cutoff = self.time_ms() - stale_ms
+        for package_id, updated_ms in self.recency.items():
+            if updated_ms > cutoff:
+                break
+            yield package_id
+
+    def query(self, status=None, region=None, stale_ms=None, limit=None):
+        """
+        Packages matching all given filters; stale_ms selects packages not updated
+        for at least that long, oldest first. Cost is bounded by the smallest
+        filter's result, or by the stale prefix when stale_ms is the only filter.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        sets = []
+        if status is not None:
+            sets.append(self.by_status.get(status, ()))
+        if region is not None:
+            sets.append(self.by_region.get(region, ()))
+        if stale_ms is not None and not sets:
+            candidates, checks = self._stale(stale_ms), []
+        elif sets:
+            sets.sort(key=len)
+            candidates, checks = iter(sets[0]), sets[1:]
+            if stale_ms is not None:
+                checks.append(_StaleCheck(self.entries, self.time_ms() - stale_ms))
+        else:
+            candidates, checks = iter(self.entries), []
+        out = []
+        for package_id in candidates:
+            if all(package_id in s for s in checks):
+                out.append(self._record(package_id, self.entries[package_id]))
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            "packages": len(self.entries),
+            "by_status": {k: len(v) for k, v in self.by_status.items()},
+            "by_region": {k: len(v) for k, v in self.by_region.items()},
+        }
+
+class _StaleCheck:
+    # membership test "updated at or before cutoff", usable alongside the index sets
+    __slots__ = ("entries", "cutoff")
+
+    def __init__(self, entries, cutoff):
+        self.entries = entries
+        self.cutoff = cutoff
+
+    def __contains__(self, package_id):
+        return self.entries[package_id]["updated_ms"] <= self.cutoff
@@ -0,0 +1,234 @@
+# group2/logio.py
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+def iter_jsonl_chunks(path, chunk_bytes=DEFAULT_CHUNK_BYTES, start=0, end=None):
+    """
+    Yield lists of decoded records from a JSON-lines file, roughly chunk_bytes of
+    text at a time, so callers never hold more than one chunk in memory.
+    Blank and malformed lines are skipped. start/end are byte offsets; end stops
+    reading at the last complete line before it.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start)
+        pos = start
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                break
+            keep = []
+            for line in lines:
+                pos += len(line)
+                if end is not None and pos > end:
+                    break
+                line = line.strip()
+                if line:
+                    keep.append(line)
+            recs = decode_lines(keep)
+            if recs:
+                yield recs
+            if end is not None and pos >= end:
+                break
+
+def decode_lines(lines):
+    # one json.loads call per chunk is several times faster than one per line;
+    # fall back to line-by-line only when the chunk contains a bad record
+    if not lines:
+        return []
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]")
+    except Exception:
+        pass
+    recs = []
+    for line in lines:
+        try:
+            recs.append(json.loads(line))
+        except Exception:
+            continue
+    return recs
+
+def hlc_fields(rec):
+    """Return (phys, cnt, node) from a log record; older logs store hlc as [phys, cnt]."""
+    h = rec.get("hlc")
+    if isinstance(h, dict):
+        return h.get("phys", 0), h.get("cnt", 0), h.get("node", rec.get("src", ""))
+    if isinstance(h, (list, tuple)) and len(h) >= 2:
+        return h[0], h[1], rec.get("src", "")
+    return 0, 0, rec.get("src", "")
+
+def tail_offset(path, n_lines, block_bytes=64 * 1024):
+    """
+    Byte offset where the last n_lines complete lines of path begin (0 if the
+    file is shorter). n_lines <= 0 means the whole file, like recs[-0:].
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    if n_lines <= 0:
+        return 0
+    with open(path, "rb") as f:
+        pos = size
+        # a trailing newline terminates the last line rather than starting a new one
+        f.seek(max(0, size - 1))
+        skip_last = f.read(1) == b"\n"
+        seen = 0
+        while pos > 0:
+            read = min(block_bytes, pos)
+            pos -= read
+            f.seek(pos)
+            block = f.read(read)
+            end = len(block)
+            if skip_last and pos + end == size:
+                end -= 1
+            i = block.rfind(b"\n", 0, end)
+            while i != -1:
+                seen += 1
+                if seen == n_lines:
+                    return pos + i + 1
+                i = block.rfind(b"\n", 0, i)
+    return 0
+
+def iter_raw_chunks(path, start=0, chunk_bytes=64 * 1024):
+    """Yield the file's bytes from start in chunks that always end on a line boundary."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                break
+            if not lines[-1].endswith(b"\n"):
+                # partially written last line: hold it back
+                lines.pop()
+                if not lines:
+                    break
+                yield b"".join(lines)
+                break
+            yield b"".join(lines)
+
+_FIELD_PATTERNS = {
+    "int": rb'"%s": (-?\d+)[,}\s]',
+    "str": rb'"%s": (?:"([^"\\]*)"|null)',
+}
+_compiled = {}
+
+def extract_fields(block, fields, layout=None):
+    """
+    Columns for scalar JSON fields in a block of JSON lines, with one regex pass
+    per field instead of decoding every record. fields maps key -> "int" or
+    "str"; ints come back as an int64 array, strings as a list of bytes (b"" for
+    null). Keys may be nested (e.g. "phys" inside "hlc") as long as they are
+    unique per record. Returns None unless every field occurs exactly once per
+    record line; callers then fall back to decode_lines for that block.
+
+    layout is an optional compiled regex for the fixed key order a writer uses,
+    with one group per field in fields order; when it matches every line, one
+    pass replaces the per-field scans.
+    """
+    n = block.count(b"\n{") + block.startswith(b"{")
+    if layout is not None:
+        found = layout.findall(block)
+        if len(found) == n and n:
+            cols = dict(zip(fields, zip(*found)))
+            for key, kind in fields.items():
+                if kind == "int":
+                    cols[key] = np.fromiter(map(int, cols[key]), dtype=np.int64, count=n)
+            return cols
+    cols = {}
+    for key, kind in fields.items():
+        pat = _compiled.get((key, kind))
+        if pat is None:
+            pat = _compiled[(key, kind)] = re.compile(_FIELD_PATTERNS[kind] % re.escape(key.encode()))
+        found = pat.findall(block)
+        if len(found) != n:
+            return None
+        if kind == "int":
+            found = np.fromiter(map(int, found), dtype=np.int64, count=n)
+        cols[key] = found
+    return cols
+
+def iter_field_chunks(path, fields, chunk_bytes=DEFAULT_CHUNK_BYTES, start=0, end=None, layout=None):
+    """
+    Yield (columns, None) per chunk of path when extract_fields can read it, else
+    (None, records) with the chunk decoded as in iter_jsonl_chunks. start/end are
+    byte offsets with the same meaning as there; layout is passed to extract_fields.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start)
+        pos = start
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                break
+            done = False
+            if end is not None:
+                keep = 0
+                for line in lines:
+                    if pos + len(line) > end:
+                        done = True
+                        break
+                    pos += len(line)
+                    keep += 1
+                lines = lines[:keep]
+                done = done or pos >= end
+            tail = None
+            if lines and not lines[-1].endswith(b"\n"):
+                tail = lines.pop()  # unterminated last line, decoded on its own
+            if lines:
+                block = b"".join(lines)
+                cols = extract_fields(block, fields, layout)
+                if cols is not None:
+                    if len(cols[next(iter(fields))]):
+                        yield cols, None
+                else:
+                    recs = decode_lines([l.strip() for l in lines if l.strip()])
+                    if recs:
+                        yield None, recs
+            if tail is not None:
+                recs = decode_lines([tail.strip()] if tail.strip() else [])
+                if recs:
+                    yield None, recs
+            if done:
+                break
+
+class Interner:
+    """Maps strings to dense ints; ids follow first-seen order."""
+
+    def __init__(self):
+        self.ids = {}
+        self._names = []
+
+    def __call__(self, name):
+        name = "" if name is None else str(name)
+        return self.ids.setdefault(name, len(self.ids))
+
+    def intern_all(self, names):
+        ids = self.ids
+        return [ids.setdefault(n, len(ids)) for n in names]
+
+    @property
+    def names(self):
+        if len(self._names) != len(self.ids):
+            self._names = list(self.ids)
+        return self._names
+
+    def ranks(self):
+        """Array mapping id -> position in lexicographic order (for string tie-breaks)."""
+        names = self.names
+        order = np.argsort(np.asarray(names, dtype=str), kind="stable")
+        ranks = np.empty(len(names), dtype=np.int64)
+        ranks[order] = np.arange(len(names))
+        return ranks
@@ -0,0 +1,129 @@
+# group2/logmerge.py
+"""
+Streaming k-way merge of per-node <node>.log files into one HLC-ordered stream.
+
+A node's own send stamps are monotonic, but its recv lines carry the sender's
+stamp and arrive in wall-clock order, so files are only *nearly* sorted. Each
+file therefore keeps a small read-ahead heap (read_ahead records) and the merge
+takes the minimum over the file heads. Memory is O(files x read_ahead) however
+long the logs are; records still out of order beyond the window are emitted
+as they come and counted in stats["late"].
+
+Files are reopened per read-ahead batch, so hundreds of nodes don't need
+hundreds of open file descriptors.
+
+Usage: python -m group2.logmerge group2/logs [--actions recv] > merged.jsonl
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+from collections import namedtuple
+
+from .logio import decode_lines, hlc_fields
+
+ACTION_RANK = {"send": 0, "recv": 1}
+
+MergedEvent = namedtuple("MergedEvent", "phys cnt node owner record")
+
+class _Source:
+    __slots__ = ("path", "owner", "offset", "heap", "eof", "seq")
+
+    def __init__(self, path, owner):
+        self.path = path
+        self.owner = owner
+        self.offset = 0
+        self.heap = []
+        self.eof = False
+        self.seq = 0
+
+    def fill(self, want, chunk_bytes, actions):
+        # read whole lines in chunk_bytes batches until `want` records are buffered
+        while not self.eof and len(self.heap) < want:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                lines = f.readlines(chunk_bytes)
+            if not lines:
+                self.eof = True
+                break
+            if not lines[-1].endswith(b"\n"):
+                # last line still being written; pick it up on a later batch
+                lines.pop()
+                if not lines:
+                    self.eof = True
+                    break
+            self.offset += sum(len(l) for l in lines)
+            for rec in decode_lines([l.strip() for l in lines if l.strip()]):
+                if not isinstance(rec, dict):
+                    continue
+                action = rec.get("action")
+                if actions is not None and action not in actions:
+                    continue
+                phys, cnt, node = hlc_fields(rec)
+                self.seq += 1
+                heapq.heappush(self.heap, (phys, cnt, str(node), ACTION_RANK.get(action, 2), self.seq, rec))
+
+class LogMerger:
+    def __init__(self, paths, actions=None, read_ahead=256, chunk_bytes=32 * 1024):
+        """paths: <node>.log files (owner = file name stem); actions: e.g. {"recv"} to filter."""
+        self.sources = [_Source(p, os.path.basename(p)[:-4] if p.endswith(".log") else os.path.basename(p)) for p in paths]
+        self.actions = set(actions) if actions else None
+        self.read_ahead = max(1, read_ahead)
+        self.chunk_bytes = chunk_bytes
+        self.stats = {"files": len(self.sources), "events": 0, "late": 0}
+
+    def __iter__(self):
+        low = max(1, self.read_ahead // 2)
+        heads = []
+        for i, src in enumerate(self.sources):
+            src.fill(self.read_ahead, self.chunk_bytes, self.actions)
+            if src.heap:
+                heads.append((src.heap[0][:5], i))
+        heapq.heapify(heads)
+        last = None
+        while heads:
+            _, i = heapq.heappop(heads)
+            src = self.sources[i]
+            phys, cnt, node, rank, _, rec = heapq.heappop(src.heap)
+            if len(src.heap) < low:
+                src.fill(self.read_ahead, self.chunk_bytes, self.actions)
+            if src.heap:
+                heapq.heappush(heads, (src.heap[0][:5], i))
+            key = (phys, cnt, node, rank)
+            if last is not None and key < last:
+                self.stats["late"] += 1
+            else:
+                last = key
+            self.stats["events"] += 1
+            yield MergedEvent(phys, cnt, node, src.owner, rec)
+
+def node_log_paths(log_dir):
+    return [os.path.join(log_dir, fn) for fn in sorted(os.listdir(log_dir)) if fn.endswith(".log")]
+
+def merge_node_logs(log_dir, actions=None, read_ahead=256, chunk_bytes=32 * 1024):
+    """Merged MergedEvent stream over every <node>.log in log_dir."""
+    return LogMerger(node_log_paths(log_dir), actions, read_ahead, chunk_bytes)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Merge per-node logs into one HLC-ordered JSON-lines stream.")
+    ap.add_argument("log_dir")
+    ap.add_argument("--actions", help="comma-separated actions to keep, e.g. send or recv")
+    ap.add_argument("--read-ahead", type=int, default=256, help="records buffered per file for reordering")
+    ap.add_argument("-o", "--output", help="output file (default stdout)")
+    args = ap.parse_args(argv)
+    merger = merge_node_logs(args.log_dir, args.actions.split(",") if args.actions else None, args.read_ahead)
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for ev in merger:
+            rec = dict(ev.record)
+            rec["owner"] = ev.owner
+            out.write(json.dumps(rec) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    print(json.dumps(merger.stats), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import json
+import os
+from types import MappingProxyType
 from dataclasses import dataclass
-from .clock import HLC, HLCStamp
+from .clock import HLC, HLCStamp, now_ms
 
 @dataclass
 class Message:
@@ -11,17 +13,39 @@ class Message:
     dst: str
     sent_ts: int  # physical ms when sent (local)
 
+# shared read-only stand-in for the state/inflight of nodes that never saw a package
+_EMPTY = MappingProxyType({})
+
 class Node:
-    def __init__(self, node_id: str, offset: int = 0, log_dir: str = "group2/logs"):
-        # offset is used in tests/simulations to simulate clock skew by overriding get_physical_ms
-        if offset != 0:
-            self.clock = HLC(node_id, get_physical_ms=lambda: int(__import__('time').time() * 1000) + offset)
-        else:
-            self.clock = HLC(node_id)
+    __slots__ = ("node_id", "clock", "log_dir", "_state", "_inflight", "index")
+
+    def __init__(self, node_id: str, offset: int = 0, log_dir: str = "group2/logs", get_physical_ms=now_ms, index=None):
+        # offset simulates clock skew; it is applied by the HLC on top of the shared time source
+        self.clock = HLC(node_id, get_physical_ms=get_physical_ms, offset=offset)
         self.node_id = node_id
-        self.state = {}  # package_id -> last known info: dict with hlc, payload, node
-        self.inflight = {}  # package_id -> Message (sent but not yet received)
+        # dicts are only allocated once the node first touches a package
+        self._state = None  # package_id -> last known info: dict with hlc, payload, node
+        self._inflight = None  # package_id -> Message (sent but not yet received)
         self.log_dir = log_dir
+        self.index = index  # shared PackageIndex told about every state change, if any
+
+    @property
+    def state(self):
+        return self._state if self._state is not None else _EMPTY
+
+    @property
+    def inflight(self):
+        return self._inflight if self._inflight is not None else _EMPTY
+
+    def _hot_state(self):
+        if self._state is None:
+            self._state = {}
+        return self._state
+
+    def _hot_inflight(self):
+        if self._inflight is None:
+            self._inflight = {}
+        return self._inflight
 
     def stamp_event(self):
         return self.clock.now()
@@ -31,13 +55,15 @@ class Node:
 
     def send(self, package_id: str, payload: dict, dst: str, send_ts: int = None) -> Message:
         hlc = self.stamp_event()
-        sent_ts = send_ts if send_ts is not None else int(__import__('time').time() * 1000)
+        sent_ts = send_ts if send_ts is not None else self.clock.get_physical_ms()
         msg = Message(package_id=package_id, payload=payload, hlc=hlc, src=self.node_id, dst=dst, sent_ts=sent_ts)
         # log local send
         self._log_event("send", msg)
         # update local state (optimistic)
-        self.state[package_id] = {"hlc": hlc.to_tuple(), "payload": payload, "node": self.node_id}
-        self.inflight[package_id] = msg  # Track as inflight
+        self._hot_state()[package_id] = {"hlc": hlc.to_tuple(), "payload": payload, "node": self.node_id}
+        if self.index is not None:
+            self.index.update(package_id, hlc.to_tuple(), payload, self.node_id)
+        self._hot_inflight()[package_id] = msg  # Track as inflight
         return msg
 
     def receive(self, msg: Message, arrival_ts: int):
@@ -58,14 +84,26 @@ class Node:
                 update = True
 
         if update:
-            self.state[msg.package_id] = {"hlc": incoming_hlc.to_tuple(), "payload": msg.payload, "node": msg.src}
+            self._hot_state()[msg.package_id] = {"hlc": incoming_hlc.to_tuple(), "payload": msg.payload, "node": msg.src}
+            if self.index is not None:
+                self.index.update(msg.package_id, incoming_hlc.to_tuple(), msg.payload, self.node_id)
         # Remove from inflight if present
-        if msg.package_id in self.inflight:
-            del self.inflight[msg.package_id]
+        if self._inflight and msg.package_id in self._inflight:
+            del self._inflight[msg.package_id]
         # log receive
         self._log_event("recv", msg, arrival_ts)
         return update
 
+    def log_path(self):
+        return f"{self.log_dir}/{self.node_id}.log"
+
+    def log_offset(self):
+        # byte length of this node's event log; a snapshot's cut is the log prefix up to here
+        try:
+            return os.path.getsize(self.log_path())
+        except OSError:
+            return 0
+
     def _log_event(self, action: str, msg: Message, ts: int = None):
         entry = {
             "action": action,
@@ -75,7 +113,7 @@ class Node:
             "package_id": msg.package_id,
             "payload": msg.payload,
             "sent_ts": msg.sent_ts,
-            "arrival_ts": ts or int(__import__('time').time() * 1000)
+            "arrival_ts": ts or self.clock.get_physical_ms()
         }
-        with open(f"{self.log_dir}/{self.node_id}.log", "a") as f:
+        with open(self.log_path(), "a") as f:
             f.write(json.dumps(entry) + "\n")
\ No newline at end of file
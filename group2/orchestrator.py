@@ -3,8 +3,10 @@ import json
 import random
 import os
 from .node import Node
+from .clock import now_ms
 from .snapshot import SnapshotCoordinator
 from .detector import AnomalyDetector
+from .index import PackageIndex
 from typing import Dict, List
 
 # --- Define continents with time offsets to simulate clock drift ---
@@ -19,19 +21,28 @@ CONTINENT_OFFSETS = {
 }
 
 def setup_global_company(orchestrator, nodes_per_region=200):
+    """Build nodes_per_region nodes per continent; returns {"nodes", "elapsed_ms"} for startup reporting."""
+    started = time.perf_counter()
     for continent, offset in CONTINENT_OFFSETS.items():
         orchestrator.add_region(continent)
         for i in range(1, nodes_per_region + 1):
             node_id = f"{continent}-N{i}"
             orchestrator.add_node(node_id, continent, offset=offset + i * 10)
+    return {"nodes": len(orchestrator.nodes), "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
 
 class HierarchicalOrchestrator:
-    def __init__(self, log_dir="group2/logs", drift_threshold_ms=2000):
+    def __init__(self, log_dir="group2/logs", drift_threshold_ms=2000, time_ms=now_ms, sleep=time.sleep):
+        # time_ms/sleep default to wall time; replay swaps in a virtual clock
+        self.time_ms = time_ms
+        self.sleep = sleep
         self.nodes: Dict[str, Node] = {}
         self.node_region: Dict[str, str] = {}   # node_id -> region_id
         self.regions: Dict[str, List[str]] = {} # region_id -> list[node_id]
         self.log_dir = log_dir
         self.ws_listeners = []
+        self.generation = 0  # bumped on every state change; lets snapshotters skip clean state
+        self.archive = None  # PackageArchive of evicted packages, set by RetentionManager
+        self.index = PackageIndex(self.node_region, time_ms=time_ms)  # status/region/staleness lookups
         os.makedirs(self.log_dir, exist_ok=True)
         self.detector = AnomalyDetector(log_path=os.path.join(log_dir, "anomalies.jsonl"), drift_threshold=drift_threshold_ms)
         open(f"{self.log_dir}/deliveries.jsonl", "a").close()
@@ -43,19 +54,24 @@ class HierarchicalOrchestrator:
     def add_node(self, node_id: str, region_id: str, offset: int = 0):
         if region_id not in self.regions:
             self.add_region(region_id)
-        self.nodes[node_id] = Node(node_id, offset=offset, log_dir=self.log_dir)
+        self.nodes[node_id] = Node(node_id, offset=offset, log_dir=self.log_dir, get_physical_ms=self.time_ms,
+                                   index=self.index)
         self.node_region[node_id] = region_id
         self.regions[region_id].append(node_id)
 
     def send(self, src: str, dst: str, package_id: str, payload: dict, simulate_latency_ms: int = None):
         if src not in self.nodes or dst not in self.nodes:
             raise ValueError("Unknown src or dst node")
-        send_pt = int(time.time() * 1000)
+        send_pt = self.time_ms()
         msg = self.nodes[src].send(package_id, payload, dst, send_pt)
         latency = simulate_latency_ms if simulate_latency_ms is not None else random.randint(10, 200)
-        time.sleep(latency / 1000.0)
-        arrival_ts = int(time.time() * 1000)
+        self.sleep(latency / 1000.0)
+        arrival_ts = self.time_ms()
         applied = self.nodes[dst].receive(msg, arrival_ts)
+        # the message is no longer in the src->dst channel once dst has applied it
+        if self.nodes[src].inflight.get(package_id) is msg:
+            del self.nodes[src].inflight[package_id]
+        self.generation += 1
         try:
             self.detector.check_drift(dst, msg.hlc.phys, arrival_ts)
         except Exception:
@@ -94,10 +110,17 @@ class HierarchicalOrchestrator:
 
     # ---------- hierarchical snapshot logic ----------
     def chandy_lamport_snapshot(self, snapshot_id: str = None):
+        snapshot = self.capture_snapshot(snapshot_id)
+        self.write_snapshot(snapshot)
+        return snapshot
+
+    def capture_snapshot(self, snapshot_id: str = None):
         """
         Implements Chandy-Lamport snapshot semantics:
         - Captures local state of each node
         - Captures all inflight messages (sent but not yet received)
+        Each node also records its HLC frontier and the byte length of its event
+        log, so the cut can be checked offline (see group2.cut_verifier).
         """
         snapshot = {    
             "nodes": {},
@@ -108,7 +131,8 @@ class HierarchicalOrchestrator:
             snapshot["nodes"][node_id] = {
                 "state": dict(getattr(node, "state", {})),  # copy of local state
                 "region": self.node_region.get(node_id),
-                "hlc": getattr(node, "hlc", None),
+                "hlc": {"phys": node.clock.last_phys, "cnt": node.clock.last_cnt, "node": node_id},
+                "log_offset": node.log_offset(),
             }
             # 2. Capture inflight messages for this node
             # Assume node.inflight is a dict: {package_id: message}
@@ -118,18 +142,30 @@ class HierarchicalOrchestrator:
                     "from": getattr(msg, "src", None),
                     "to": getattr(msg, "dst", None),
                     "package_id": pkg_id,
-                    "hlc": getattr(msg, "hlc", None),
+                    "hlc": {"phys": msg.hlc.phys, "cnt": msg.hlc.cnt, "node": msg.hlc.node_id},
                     "payload": getattr(msg, "payload", None),
                     "sent_ts": getattr(msg, "sent_ts", None),
                     "src_region": self.node_region.get(getattr(msg, "src", None)),
                     "dst_region": self.node_region.get(getattr(msg, "dst", None))
                 })
 
-        # Save snapshot to file
-        global_fname = f"{self.log_dir}/global_snapshot.json"
-        with open(global_fname, "w") as f:
-            json.dump(snapshot, f, indent=2)
+        if self.archive is not None:
+            # evicted terminal packages live in the archive, not in node state
+            snapshot["archived"] = {"path": os.path.abspath(self.archive.path), "packages": self.archive.count()}
         return snapshot
+
+    def write_snapshot(self, snapshot, fname=None):
+        """
+        Write a captured snapshot atomically (temp file + rename), so readers of
+        global_snapshot.json never see a half-written file. Touches no node state,
+        so it can run on another thread than the one driving sends.
+        """
+        fname = fname or f"{self.log_dir}/global_snapshot.json"
+        tmp = f"{fname}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp, fname)
+        return fname
     
     def region_local_snapshot(self, region_id: str, snapshot_id: str = None):
         if region_id not in self.regions:
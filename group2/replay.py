@@ -0,0 +1,233 @@
+# group2/replay.py
+"""
+Replay recorded deliveries through a fresh HierarchicalOrchestrator.
+
+Every recv line in the per-node <node>.log files is a complete delivery record
+(src, dst, package, payload, sender HLC, sent_ts, arrival_ts). The replay feeds
+them in sender-HLC order into an orchestrator that runs on a virtual clock, so
+the detector sees the recorded send/arrival times while node skew comes from the
+replay's own settings (drift threshold, continent offsets). Snapshots are taken
+along the way and the final one can be checked with the cut verifier.
+
+Usage:
+    python -m group2.replay backend/logs --out /tmp/replay --speed 0
+    python -m group2.replay backend/logs --out /tmp/replay --drift-threshold 5000 --offset EU=0
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+from .logio import hlc_fields
+from .logmerge import merge_node_logs
+from .orchestrator import HierarchicalOrchestrator, CONTINENT_OFFSETS
+
+_NODE_INDEX = re.compile(r"-N(\d+)$")
+# written into every replay output directory; only directories carrying it are wiped
+REPLAY_MARKER = ".replay-output"
+
+class VirtualClock:
+    """Physical time for a replayed orchestrator: set from the recording, advanced by sleep()."""
+
+    def __init__(self, start_ms=0):
+        self.ms = start_ms
+
+    def now_ms(self):
+        return self.ms
+
+    def set(self, ms):
+        self.ms = ms
+
+    def sleep(self, seconds):
+        self.ms += int(round(seconds * 1000))
+
+def recorded_deliveries(log_dir, read_ahead=256):
+    """LogMerger over the recv records of all <node>.log files; its stats count out-of-window ("late") records."""
+    return merge_node_logs(log_dir, actions={"recv"}, read_ahead=read_ahead)
+
+def iter_recorded_deliveries(log_dir, read_ahead=256):
+    """Yield recv records from all <node>.log files in sender-HLC order, streamed via the k-way merge."""
+    return (ev.record for ev in recorded_deliveries(log_dir, read_ahead))
+
+def node_offset(node_id, continent_offsets, spacing_ms=10):
+    """Skew for a node id like 'EU-N12', mirroring setup_global_company."""
+    region = node_id.split("-", 1)[0]
+    m = _NODE_INDEX.search(node_id)
+    return continent_offsets.get(region, 0) + (int(m.group(1)) * spacing_ms if m else 0)
+
+class ReplayEngine:
+    def __init__(self, source_dir, out_dir, speed=None, drift_threshold_ms=2000, continent_offsets=None,
+                 snapshot_every=None, verify=True, read_ahead=256):
+        """
+        speed: None/0 replays unthrottled, 1.0 in recorded real time, N in N x real time.
+        snapshot_every: take a Chandy-Lamport snapshot every N events (plus one at the end).
+        read_ahead: per-file reorder window of the log merge; records later than that
+        are replayed out of HLC order and reported as merge["late"].
+        """
+        src, out = os.path.realpath(source_dir), os.path.realpath(out_dir)
+        if src == out or src.startswith(out.rstrip(os.sep) + os.sep):
+            raise ValueError("replay output directory must not be or contain the source logs")
+        self.source_dir = source_dir
+        self.out_dir = out_dir
+        self.speed = speed or None
+        self.drift_threshold_ms = drift_threshold_ms
+        self.continent_offsets = dict(CONTINENT_OFFSETS if continent_offsets is None else continent_offsets)
+        self.snapshot_every = snapshot_every
+        self.verify = verify
+        self.read_ahead = read_ahead
+
+    def _orchestrator(self, clock):
+        if os.path.exists(self.out_dir):
+            # never wipe a directory this engine didn't create
+            if os.listdir(self.out_dir) and not os.path.exists(os.path.join(self.out_dir, REPLAY_MARKER)):
+                raise ValueError(f"{self.out_dir} is not empty and is not a replay output directory")
+            shutil.rmtree(self.out_dir)
+        orch = HierarchicalOrchestrator(log_dir=self.out_dir, drift_threshold_ms=self.drift_threshold_ms,
+                                        time_ms=clock.now_ms, sleep=clock.sleep)
+        open(os.path.join(self.out_dir, REPLAY_MARKER), "w").close()
+        return orch
+
+    def _ensure_node(self, orch, node_id):
+        if node_id not in orch.nodes:
+            orch.add_node(node_id, node_id.split("-", 1)[0], offset=node_offset(node_id, self.continent_offsets))
+
+    def run(self, events=None, limit=None):
+        """Replay events (default: recorded deliveries from source_dir); returns a report dict."""
+        clock = VirtualClock()
+        orch = self._orchestrator(clock)
+        merger = None
+        if events is None:
+            merger = recorded_deliveries(self.source_dir, self.read_ahead)
+            events = (ev.record for ev in merger)
+        n = applied = snapshots = 0
+        first_sent = None
+        started = time.perf_counter()
+        for rec in events:
+            if limit is not None and n >= limit:
+                break
+            src, dst = rec.get("src"), rec.get("dst")
+            sent_ts = rec.get("sent_ts") or hlc_fields(rec)[0]
+            arrival_ts = rec.get("arrival_ts") or sent_ts
+            if not src or not dst:
+                continue
+            if self.speed:
+                # hold back so recorded gaps play out at `speed` x real time
+                first_sent = sent_ts if first_sent is None else first_sent
+                ahead = (sent_ts - first_sent) / 1000.0 / self.speed - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+            self._ensure_node(orch, src)
+            self._ensure_node(orch, dst)
+            clock.set(sent_ts)
+            record = orch.send(src, dst, rec.get("package_id"), rec.get("payload"),
+                               simulate_latency_ms=max(0, arrival_ts - sent_ts))
+            applied += bool(record["applied"])
+            n += 1
+            if self.snapshot_every and n % self.snapshot_every == 0:
+                orch.chandy_lamport_snapshot()
+                snapshots += 1
+        elapsed = time.perf_counter() - started
+        snap = orch.chandy_lamport_snapshot()
+        snapshots += 1
+        report = {
+            "source": self.source_dir,
+            "out": self.out_dir,
+            "settings": {"speed": self.speed, "drift_threshold_ms": self.drift_threshold_ms,
+                         "continent_offsets": self.continent_offsets},
+            "events": n,
+            "applied": applied,
+            "not_applied": n - applied,
+            "nodes": len(orch.nodes),
+            "elapsed_s": round(elapsed, 3),
+            "events_per_s": round(n / elapsed, 1) if elapsed > 0 else None,
+            "snapshots": snapshots,
+            "drift_anomalies_by_region": _anomalies_by_region(orch),
+            "final_packages": _final_packages(snap),
+            "merge": None if merger is None else dict(merger.stats, read_ahead=self.read_ahead),
+            "warnings": [],
+        }
+        if merger is not None and merger.stats["late"]:
+            report["warnings"].append(
+                f"{merger.stats['late']} recorded deliveries fell outside the {self.read_ahead}-record merge "
+                "window and were replayed out of HLC order; rerun with a larger --read-ahead")
+        if self.verify:
+            from .cut_verifier import verify_cut
+            report["cut_ok"] = verify_cut(snap, self.out_dir)["ok"]
+        return report
+
+def _anomalies_by_region(orch):
+    by_region = {}
+    for node, count in orch.detector.summarize_region_drifts(orch.log_dir).items():
+        region = orch.node_region.get(node, "?")
+        by_region[region] = by_region.get(region, 0) + count
+    return dict(sorted(by_region.items()))
+
+def _final_packages(snapshot):
+    # newest (phys, cnt) and status per package across all nodes of a CL snapshot
+    final = {}
+    for info in snapshot["nodes"].values():
+        for pkg, entry in info["state"].items():
+            h = tuple(entry["hlc"])
+            if pkg not in final or h > tuple(final[pkg]["hlc"]):
+                final[pkg] = {"hlc": list(h), "status": (entry.get("payload") or {}).get("status")}
+    return final
+
+def diff_reports(base, other):
+    """Differences between two replay reports: counts, per-region anomalies and final package states."""
+    regions = sorted(set(base["drift_anomalies_by_region"]) | set(other["drift_anomalies_by_region"]))
+    a, b = base["final_packages"], other["final_packages"]
+    status_changed = sorted(p for p in set(a) & set(b) if a[p]["status"] != b[p]["status"])
+    return {
+        "applied": other["applied"] - base["applied"],
+        "drift_anomalies": {r: other["drift_anomalies_by_region"].get(r, 0) - base["drift_anomalies_by_region"].get(r, 0)
+                            for r in regions},
+        "packages_only_in_base": sorted(set(a) - set(b)),
+        "packages_only_in_other": sorted(set(b) - set(a)),
+        "package_status_changed": status_changed,
+        "events_per_s": (base["events_per_s"], other["events_per_s"]),
+    }
+
+def _parse_offsets(items):
+    offsets = dict(CONTINENT_OFFSETS)
+    for item in items or []:
+        region, _, value = item.partition("=")
+        offsets[region] = int(value)
+    return offsets
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay recorded node logs through the orchestrator.")
+    ap.add_argument("source", help="directory with recorded <node>.log files")
+    ap.add_argument("--out", required=True, help="scratch directory for replay logs (wiped if a previous replay wrote it)")
+    ap.add_argument("--speed", type=float, default=0, help="0 = unthrottled, 1 = real time, N = N x real time")
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--snapshot-every", type=int)
+    ap.add_argument("--read-ahead", type=int, default=256, help="per-file reorder window of the log merge")
+    ap.add_argument("--strict", action="store_true", help="exit 1 if any replay produced warnings")
+    ap.add_argument("--drift-threshold", type=int, help="what-if drift threshold (ms)")
+    ap.add_argument("--offset", action="append", metavar="REGION=MS", help="what-if continent offset, repeatable")
+    args = ap.parse_args(argv)
+
+    base = ReplayEngine(args.source, os.path.join(args.out, "base"), speed=args.speed,
+                        snapshot_every=args.snapshot_every, read_ahead=args.read_ahead).run(limit=args.limit)
+    result = {"base": {k: v for k, v in base.items() if k != "final_packages"}}
+    if args.drift_threshold is not None or args.offset:
+        what_if = ReplayEngine(args.source, os.path.join(args.out, "what_if"), speed=args.speed,
+                               drift_threshold_ms=args.drift_threshold if args.drift_threshold is not None else 2000,
+                               continent_offsets=_parse_offsets(args.offset),
+                               snapshot_every=args.snapshot_every, read_ahead=args.read_ahead).run(limit=args.limit)
+        result["what_if"] = {k: v for k, v in what_if.items() if k != "final_packages"}
+        result["diff"] = diff_reports(base, what_if)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    warned = False
+    for name in ("base", "what_if"):
+        for warning in result.get(name, {}).get("warnings", []):
+            print(f"warning ({name}): {warning}", file=sys.stderr)
+            warned = True
+    return 1 if warned and args.strict else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
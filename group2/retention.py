@@ -0,0 +1,190 @@
+# group2/retention.py
+"""
+Retention for package state: packages that reached a terminal status are moved
+out of the nodes' hot `state` dicts into an on-disk SQLite archive once they are
+older than a TTL, or earlier when the hot set exceeds a memory budget.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .clock import now_ms
+
+TERMINAL_STATUSES = frozenset({"DELIVERED"})
+
+class PackageArchive:
+    """
+    Cold store of evicted packages, one row per package with its newest state
+    and the nodes that held it. Only per-region counters are kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS packages ("
+            " package_id TEXT PRIMARY KEY, status TEXT, phys INTEGER, cnt INTEGER, node TEXT,"
+            " region TEXT, holders TEXT, payload TEXT, archived_ms INTEGER) WITHOUT ROWID"
+        )
+        self._db.commit()
+        self.region_counts = dict(self._db.execute("SELECT region, COUNT(*) FROM packages GROUP BY region").fetchall())
+
+    def add_many(self, records):
+        """records: dicts with package_id, status, hlc (phys, cnt), node, region, holders, payload."""
+        rows = [(r["package_id"], r["status"], r["hlc"][0], r["hlc"][1], r["node"], r["region"],
+                 json.dumps(r["holders"]), json.dumps(r["payload"]), r.get("archived_ms") or now_ms())
+                for r in records]
+        with self._lock:
+            existing = set()
+            for i in range(0, len(rows), 500):
+                ids = [row[0] for row in rows[i:i + 500]]
+                q = "SELECT package_id FROM packages WHERE package_id IN (%s)" % ",".join("?" * len(ids))
+                existing.update(pid for (pid,) in self._db.execute(q, ids))
+            self._db.executemany("INSERT OR REPLACE INTO packages VALUES (?,?,?,?,?,?,?,?,?)", rows)
+            self._db.commit()
+            for row in rows:
+                if row[0] not in existing:
+                    self.region_counts[row[5]] = self.region_counts.get(row[5], 0) + 1
+
+    def get(self, package_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM packages WHERE package_id = ?", (package_id,)).fetchone()
+        return None if row is None else self._to_record(row)
+
+    def recent(self, limit=100):
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM packages ORDER BY archived_ms DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def iter_ids(self):
+        with self._lock:
+            ids = [pid for (pid,) in self._db.execute("SELECT package_id FROM packages")]
+        return iter(ids)
+
+    def count(self):
+        return sum(self.region_counts.values())
+
+    @staticmethod
+    def _to_record(row):
+        pid, status, phys, cnt, node, region, holders, payload, archived_ms = row
+        return {"package_id": pid, "status": status, "hlc": [phys, cnt], "node": node, "region": region,
+                "holders": json.loads(holders), "payload": json.loads(payload), "archived_ms": archived_ms}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class RetentionPolicy:
+    def __init__(self, ttl_ms=10 * 60 * 1000, max_hot_packages=None, terminal_statuses=TERMINAL_STATUSES):
+        self.ttl_ms = ttl_ms
+        self.max_hot_packages = max_hot_packages
+        self.terminal_statuses = frozenset(terminal_statuses)
+
+class RetentionManager:
+    """
+    Sweeps an orchestrator's nodes and archives terminal packages. sweep() and
+    lookup() read and mutate node state, so call them from the thread that
+    drives sends.
+
+    Package age is measured on the orchestrator's time source (orch.time_ms)
+    from the last update the package index saw, not from HLC phys, which
+    carries the holding node's clock offset.
+    """
+
+    def __init__(self, orch, archive: PackageArchive, policy: RetentionPolicy = None):
+        self.orch = orch
+        self.archive = archive
+        self.policy = policy or RetentionPolicy()
+        self.evicted_total = 0
+        self.sweeps = 0
+        self.last_sweep = None
+        orch.archive = archive
+
+    def sweep(self, now=None):
+        now = now if now is not None else getattr(self.orch, "time_ms", now_ms)()
+        index = getattr(self.orch, "index", None)
+        entries = index.entries if index is not None else {}
+        started = time.perf_counter()
+        newest = {}   # package_id -> (hlc, node_id holding it, entry)
+        holders = {}  # package_id -> [node_id]
+        busy = set()  # packages still inflight somewhere
+        for node_id, node in self.orch.nodes.items():
+            busy.update(node.inflight)
+            for pkg, entry in node.state.items():
+                holders.setdefault(pkg, []).append(node_id)
+                hlc = tuple(entry["hlc"])
+                cur = newest.get(pkg)
+                # prefer the receiving holder on ties, so region is where the package ended up
+                if cur is None or hlc > cur[0] or (hlc == cur[0] and entry.get("node") != node_id):
+                    newest[pkg] = (hlc, node_id, entry)
+
+        # (last update ms, package); HLC phys only for packages the index doesn't know
+        terminal = [(entries[pkg]["updated_ms"] if pkg in entries else info[0][0], pkg)
+                    for pkg, info in newest.items()
+                    if pkg not in busy and (info[2].get("payload") or {}).get("status") in self.policy.terminal_statuses]
+        evict = {pkg for updated_ms, pkg in terminal if now - updated_ms > self.policy.ttl_ms}
+        budget = self.policy.max_hot_packages
+        if budget is not None and len(newest) - len(evict) > budget:
+            # over the memory budget: also evict the oldest remaining terminal packages
+            remaining = sorted(t for t in terminal if t[1] not in evict)
+            excess = len(newest) - len(evict) - budget
+            evict.update(pkg for _, pkg in remaining[:excess])
+
+        records = []
+        for pkg in evict:
+            hlc, holder, entry = newest[pkg]
+            records.append({
+                "package_id": pkg,
+                "status": (entry.get("payload") or {}).get("status"),
+                "hlc": hlc,
+                "node": entry.get("node"),
+                "region": self.orch.node_region.get(holder),
+                "holders": holders[pkg],
+                "payload": entry.get("payload"),
+                "archived_ms": now,
+            })
+        if records:
+            self.archive.add_many(records)
+            for rec in records:
+                for node_id in rec["holders"]:
+                    self.orch.nodes[node_id].state.pop(rec["package_id"], None)
+                if index is not None:
+                    index.discard(rec["package_id"])
+            self.orch.generation += 1
+        self.evicted_total += len(records)
+        self.sweeps += 1
+        self.last_sweep = {
+            "at_ms": now,
+            "evicted": len(records),
+            "hot_packages": len(newest) - len(records),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return self.last_sweep
+
+    def lookup(self, package_id):
+        """Hot entries for a package across nodes, or its archived record."""
+        hot = {node_id: node.state[package_id] for node_id, node in self.orch.nodes.items() if package_id in node.state}
+        if hot:
+            return {"package_id": package_id, "tier": "hot", "nodes": hot}
+        rec = self.archive.get(package_id)
+        if rec is not None:
+            return {"package_id": package_id, "tier": "cold", "record": rec}
+        return None
+
+    def stats(self):
+        return {
+            "hot_entries": sum(len(n.state) for n in self.orch.nodes.values()),
+            "hot_packages": (self.last_sweep or {}).get("hot_packages"),
+            "cold_packages": self.archive.count(),
+            "cold_by_region": dict(self.archive.region_counts),
+            "evicted_total": self.evicted_total,
+            "sweeps": self.sweeps,
+            "last_sweep": self.last_sweep,
+            "ttl_ms": self.policy.ttl_ms,
+            "max_hot_packages": self.policy.max_hot_packages,
+        }
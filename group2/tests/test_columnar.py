@@ -0,0 +1,67 @@
+import json
+import numpy as np
+from group2.columnar import ColumnarArchive, Segment
+
+REGIONS = ["EU", "NA", "AS"]
+
+def _records(n, t0=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        s, d = REGIONS[i % 3], REGIONS[(i // 3) % 3]
+        lat = int(rng.integers(10, 200))
+        yield {"arrival_ts": t0 + i * 100 + lat, "src": f"{s}-N1", "dst": f"{d}-N2", "package_id": f"P{i // 4}",
+               "hlc": {"phys": t0 + i * 100 - (50 if d == "AS" else 0), "cnt": 0, "node": f"{s}-N1"},
+               "latency_ms": lat, "applied": i % 5 != 0, "src_region": s, "dst_region": d}
+
+def _append(path, recs):
+    with open(path, "a") as f:
+        for r in recs:
+            f.write(json.dumps(r) + "\n")
+
+def test_seal_is_incremental_and_queries_match_json(tmp_path):
+    log = tmp_path / "deliveries.jsonl"
+    recs = list(_records(3000))
+    _append(log, recs[:2000])
+    with open(log, "a") as f:
+        f.write('{"arrival_ts": 1')  # line still being written
+    archive = ColumnarArchive(str(tmp_path / "col"))
+    first = archive.seal(str(log), segment_bytes=100_000, block_rows=256)
+    assert len(first) > 1 and sum(s["rows"] for s in first) == 2000
+
+    with open(log, "rb+") as f:
+        f.truncate(f.seek(0, 2) - len('{"arrival_ts": 1'))
+    _append(log, recs[2000:])
+    archive.seal(str(log), block_rows=256)
+    archive = ColumnarArchive(str(tmp_path / "col"))
+    assert archive.stats()["rows"] == 3000
+
+    res = archive.latency_percentiles()
+    assert len(res) == 9
+    for row in res:
+        lat = [r["latency_ms"] for r in recs if (r["src_region"], r["dst_region"]) == (row["src_region"], row["dst_region"])]
+        assert row["count"] == len(lat)
+        assert np.isclose(row["p50"], np.percentile(lat, 50)) and np.isclose(row["p99"], np.percentile(lat, 99))
+
+    ratio = {r["dst_region"]: r for r in archive.applied_ratio()}
+    assert ratio["EU"]["count"] == sum(r["dst_region"] == "EU" for r in recs)
+    assert ratio["EU"]["applied"] == sum(r["dst_region"] == "EU" and r["applied"] for r in recs)
+
+def test_filters_use_block_index(tmp_path):
+    log = tmp_path / "deliveries.jsonl"
+    recs = list(_records(1000))
+    _append(log, recs)
+    archive = ColumnarArchive(str(tmp_path / "col"))
+    entry = archive.seal(str(log), block_rows=100)[0]
+    seg = Segment(str(tmp_path / "col" / entry["file"]))
+    since, until = 1_000_000 + 20_000, 1_000_000 + 40_000
+    assert len(seg.block_ids(since, until)) <= 3
+
+    res = archive.latency_percentiles(by=["dst_region"], since=since, until=until, src_region=["EU", "NA"])
+    expected = [r for r in recs if since <= r["arrival_ts"] < until and r["src_region"] in ("EU", "NA")]
+    assert sum(r["count"] for r in res) == len(expected)
+    assert archive.latency_percentiles(src_region="nowhere") == []
+
+    drift = archive.drift_over_time(bin_ms=10_000)
+    assert set(drift) == set(REGIONS)
+    assert all(b["max_ms"] >= 60 for b in drift["AS"])
+    assert sum(b["count"] for series in drift.values() for b in series) == 1000
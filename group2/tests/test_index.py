@@ -0,0 +1,46 @@
+from group2.orchestrator import HierarchicalOrchestrator
+from group2.retention import PackageArchive, RetentionManager, RetentionPolicy
+from group2.replay import VirtualClock
+
+def _scan(orch, status=None, region=None):
+    # the O(nodes x packages) answer the index replaces
+    newest = {}
+    for node_id, node in orch.nodes.items():
+        for pkg, entry in node.state.items():
+            if pkg not in newest or tuple(entry["hlc"]) >= newest[pkg][0]:
+                newest[pkg] = (tuple(entry["hlc"]), entry["payload"]["status"], orch.node_region[node_id])
+    return {p for p, (_, s, r) in newest.items() if (status is None or s == status) and (region is None or r == region)}
+
+def test_index_tracks_newest_status_and_region(tmp_path):
+    clock = VirtualClock(1_000_000)
+    orch = HierarchicalOrchestrator(log_dir=str(tmp_path), time_ms=clock.now_ms, sleep=clock.sleep)
+    for node_id in ("NA-N1", "EU-N1", "AS-N1"):
+        orch.add_node(node_id, node_id[:2])
+    orch.send("NA-N1", "AS-N1", "p1", {"status": "SENT"}, simulate_latency_ms=5)
+    orch.send("NA-N1", "AS-N1", "p2", {"status": "SENT"}, simulate_latency_ms=5)
+    clock.sleep(0.6)
+    orch.send("NA-N1", "AS-N1", "p1", {"status": "IN_TRANSIT"}, simulate_latency_ms=5)
+    orch.send("EU-N1", "NA-N1", "p3", {"status": "IN_TRANSIT"}, simulate_latency_ms=5)
+    orch.send("NA-N1", "AS-N1", "p3", {"status": "IN_TRANSIT"}, simulate_latency_ms=5)
+
+    q = lambda **kw: {r["package_id"] for r in orch.index.query(**kw)}
+    assert q(status="IN_TRANSIT", region="AS") == _scan(orch, "IN_TRANSIT", "AS") == {"p1", "p3"}
+    assert q(status="SENT") == _scan(orch, "SENT") == {"p2"}
+    assert q(region="NA") == set() and q(status="LOST") == set()
+    assert q(stale_ms=500) == {"p2"} and q(status="SENT", stale_ms=1000) == set()
+    assert len(orch.index.query(region="AS", limit=1)) == 1
+    for kw in ({"status": "IN_TRANSIT"}, {}, {"stale_ms": 0}):
+        assert orch.index.query(limit=0, **kw) == []
+    assert orch.index.get("p3")["node"] == "AS-N1"
+
+def test_retention_discards_evicted_packages(tmp_path):
+    orch = HierarchicalOrchestrator(log_dir=str(tmp_path))
+    orch.add_node("NA-N1", "NA")
+    orch.add_node("EU-N1", "EU")
+    for i in range(4):
+        orch.send("NA-N1", "EU-N1", f"pkg{i}", {"status": "DELIVERED" if i % 2 else "IN_TRANSIT"}, simulate_latency_ms=0)
+    retention = RetentionManager(orch, PackageArchive(str(tmp_path / "a.sqlite")), RetentionPolicy(ttl_ms=60_000))
+    retention.sweep(now=orch.nodes["NA-N1"].clock.last_phys + 61_000)
+    assert len(orch.index) == 2 and orch.index.stats()["by_status"] == {"IN_TRANSIT": 2}
+    assert {r["package_id"] for r in orch.index.query(region="EU")} == {"pkg0", "pkg2"}
+    retention.archive.close()
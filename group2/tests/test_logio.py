@@ -0,0 +1,15 @@
+import json
+from group2.logio import iter_jsonl_chunks, iter_raw_chunks, tail_offset
+
+def test_tail_and_raw_chunks(tmp_path):
+    path = tmp_path / "deliveries.jsonl"
+    with open(path, "w") as f:
+        for i in range(1000):
+            f.write(json.dumps({"i": i}) + "\n")
+        f.write('{"i": 10')  # record still being written
+    start = tail_offset(str(path), 4)
+    assert [r["i"] for c in iter_jsonl_chunks(str(path), start=start) for r in c] == [997, 998, 999]
+    raw = b"".join(iter_raw_chunks(str(path), tail_offset(str(path), 3, block_bytes=16), chunk_bytes=8))
+    assert raw == b'{"i": 998}\n{"i": 999}\n'
+    assert sum(len(c) for c in iter_jsonl_chunks(str(path), chunk_bytes=100)) == 1000
+    assert tail_offset(str(path), 0) == tail_offset(str(path), -1) == 0  # whole file
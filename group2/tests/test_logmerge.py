@@ -0,0 +1,37 @@
+import json
+import random
+from group2.logmerge import merge_node_logs
+
+def _write(path, stamps, action="send"):
+    with open(path, "w") as f:
+        for phys, cnt, node in stamps:
+            f.write(json.dumps({"action": action, "src": node, "dst": "X",
+                                "hlc": {"phys": phys, "cnt": cnt, "node": node}, "package_id": "p"}) + "\n")
+
+def test_merge_orders_nearly_sorted_files(tmp_path):
+    rng = random.Random(1)
+    expected = []
+    for n in range(5):
+        stamps = [(1000 + 7 * i + n, i % 3, f"N{n}") for i in range(300)]
+        expected.extend(stamps)
+        # local disorder within a window of 4 records
+        for i in range(0, 300, 4):
+            block = stamps[i:i + 4]
+            rng.shuffle(block)
+            stamps[i:i + 4] = block
+        _write(tmp_path / f"N{n}.log", stamps, action="recv" if n % 2 else "send")
+    (tmp_path / "deliveries.jsonl").write_text('{"ignored": true}\n')
+
+    merger = merge_node_logs(str(tmp_path), read_ahead=8, chunk_bytes=512)
+    got = [(e.phys, e.cnt, e.node) for e in merger]
+    assert got == sorted(expected)
+    assert merger.stats == {"files": 5, "events": 1500, "late": 0}
+
+    recv_only = merge_node_logs(str(tmp_path), actions={"recv"}, read_ahead=8)
+    assert {e.owner for e in recv_only} == {"N1", "N3"}
+
+def test_window_too_small_counts_late(tmp_path):
+    _write(tmp_path / "A.log", [(5, 0, "A"), (1, 0, "A"), (2, 0, "A")])
+    merger = merge_node_logs(str(tmp_path), read_ahead=1, chunk_bytes=1)
+    assert [e.phys for e in merger] == [5, 1, 2]
+    assert merger.stats["late"] == 2
@@ -0,0 +1,73 @@
+import json
+import time
+
+import pytest
+
+from group2.orchestrator import HierarchicalOrchestrator
+from group2.replay import ReplayEngine, diff_reports
+
+def _record(log_dir):
+    orch = HierarchicalOrchestrator(log_dir=str(log_dir))
+    orch.add_node("NA-N1", "NA", offset=10)
+    orch.add_node("EU-N1", "EU", offset=5010)
+    orch.add_node("AS-N2", "AS", offset=10020)
+    for i in range(20):
+        orch.send("NA-N1", "EU-N1", f"pkg{i}", {"status": "SENT"}, simulate_latency_ms=0)
+        orch.send("EU-N1", "AS-N2", f"pkg{i}", {"status": "DELIVERED"}, simulate_latency_ms=0)
+    return orch
+
+def test_replay_reproduces_recording(tmp_path):
+    _record(tmp_path / "rec")
+    base = ReplayEngine(str(tmp_path / "rec"), str(tmp_path / "base"), snapshot_every=10).run()
+    assert base["events"] == 40 and base["applied"] == 40 and base["cut_ok"]
+    assert base["snapshots"] == 5
+    assert base["drift_anomalies_by_region"] == {"AS": 20}  # EU-N1's stamps run ~5 s ahead of arrival time
+    assert {p["status"] for p in base["final_packages"].values()} == {"DELIVERED"}
+    assert base["merge"]["late"] == 0 and base["merge"]["events"] == 40 and base["warnings"] == []
+
+    what_if = ReplayEngine(str(tmp_path / "rec"), str(tmp_path / "what_if"), drift_threshold_ms=6000).run()
+    diff = diff_reports(base, what_if)
+    assert diff["drift_anomalies"] == {"AS": -20}
+    assert diff["package_status_changed"] == [] and diff["packages_only_in_other"] == []
+
+def test_replay_speed_throttles(tmp_path):
+    # 5 deliveries 100 ms apart: a 400 ms recorded span
+    events = [{"src": "NA-N1", "dst": "EU-N1", "package_id": f"pkg{i}", "payload": {"status": "SENT"},
+               "sent_ts": 1_000_000 + 100 * i, "arrival_ts": 1_000_000 + 100 * i + 5} for i in range(5)]
+    started = time.perf_counter()
+    report = ReplayEngine(str(tmp_path / "rec"), str(tmp_path / "out"), speed=2.0, verify=False).run(events=events)
+    elapsed = time.perf_counter() - started
+    assert report["events"] == 5 and report["settings"]["speed"] == 2.0
+    assert elapsed >= 0.4 / 2.0
+    assert report["elapsed_s"] >= round(0.4 / 2.0, 3) - 0.001
+
+def test_replay_refuses_to_wipe_foreign_directories(tmp_path):
+    rec = tmp_path / "rec"
+    _record(rec)
+    with pytest.raises(ValueError):
+        ReplayEngine(str(rec), str(tmp_path))  # output would contain the source logs
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "keep.txt").write_text("x")
+    with pytest.raises(ValueError):
+        ReplayEngine(str(rec), str(other), verify=False).run(limit=1)
+    assert (other / "keep.txt").exists()
+    # a directory written by an earlier replay is reused
+    out = tmp_path / "out"
+    ReplayEngine(str(rec), str(out), verify=False).run(limit=1)
+    assert ReplayEngine(str(rec), str(out), verify=False).run(limit=2)["events"] == 2
+
+def test_replay_reports_late_records(tmp_path):
+    rec = tmp_path / "rec"
+    rec.mkdir()
+    # newest first, and larger than one merge read batch, so a 1-record window can't reorder it
+    with open(rec / "AS-N2.log", "w") as f:
+        for i in reversed(range(400)):
+            f.write(json.dumps({"action": "recv", "src": "EU-N1", "dst": "AS-N2",
+                                "hlc": {"phys": 1_000_000 + i, "cnt": 0, "node": "EU-N1"},
+                                "package_id": f"pkg{i}", "payload": {"status": "DELIVERED"},
+                                "sent_ts": 1_000_000 + i, "arrival_ts": 1_000_000 + i}) + "\n")
+    report = ReplayEngine(str(rec), str(tmp_path / "out"), verify=False, read_ahead=1).run()
+    assert report["merge"]["late"] > 0 and report["merge"]["read_ahead"] == 1
+    assert len(report["warnings"]) == 1 and "--read-ahead" in report["warnings"][0]
+    assert ReplayEngine(str(rec), str(tmp_path / "out"), verify=False, read_ahead=512).run()["merge"]["late"] == 0
@@ -0,0 +1,17 @@
+from group2.clock import now_ms
+from group2.orchestrator import HierarchicalOrchestrator, setup_global_company
+
+def test_flyweight_nodes_boot_fast(tmp_path):
+    orch = HierarchicalOrchestrator(log_dir=str(tmp_path))
+    stats = setup_global_company(orch, nodes_per_region=15000)
+    assert stats["nodes"] == 105000 == len(orch.nodes)
+    assert stats["elapsed_ms"] < 10000
+
+    a, b = orch.nodes["NA-N1"], orch.nodes["AN-N15000"]
+    assert a.clock.get_physical_ms is now_ms is b.clock.get_physical_ms
+    assert b.clock.offset == 30000 + 150000
+    assert a.state == {} and a._state is None and not hasattr(a, "__dict__")
+
+    orch.send("NA-N1", "AN-N15000", "pkg1", {"status": "SENT"}, simulate_latency_ms=0)
+    assert "pkg1" in a.state and "pkg1" in b.state
+    assert orch.nodes["EU-N1"]._state is None
@@ -0,0 +1,38 @@
+import json
+from group2.visualizer import SkewHistogram, accumulate_skew, plot_skew_density
+
+def test_skew_histogram_percentiles():
+    hist = SkewHistogram(time_bin_ms=1000, skew_range_ms=(-1000, 1000), skew_bins=200)
+    hist.add(["EU"] * 100, [1000 + i for i in range(100)], [1000 + i - 100 for i in range(100)])
+    hist.add(["AS"] * 10, [5000] * 10, [5500] * 10)
+    stats = hist.percentiles()
+    assert stats["EU"]["count"] == 100 and stats["AS"]["count"] == 10
+    assert 90 <= stats["EU"]["p50"] <= 110
+    assert -510 <= stats["AS"]["p99"] <= -490
+    assert hist.counts["EU"].shape == hist.counts["AS"].shape
+
+def test_plot_skew_density_streams_chunks(tmp_path):
+    log = tmp_path / "deliveries.jsonl"
+    with open(log, "w") as f:
+        for i in range(500):
+            rec = {"arrival_ts": 10_000 + i * 50, "hlc": {"phys": 10_000 + i * 50 - 20, "cnt": 0, "node": "A"},
+                   "dst_region": "NA" if i % 2 else "EU"}
+            f.write(json.dumps(rec) + "\n")
+        f.write("not json\n")
+    hist = accumulate_skew(str(log), chunk_bytes=1024)
+    assert hist.total == 500
+    stats = plot_skew_density(str(log), str(tmp_path / "skew.png"), chunk_bytes=1024)
+    assert set(stats) == {"EU", "NA"}
+    assert (tmp_path / "skew.png").exists() and (tmp_path / "skew.json").exists()
+
+def test_skew_histogram_grows_both_ways_and_rejects_outliers():
+    hist = SkewHistogram(time_bin_ms=1000, skew_range_ms=(-100, 100), skew_bins=10, max_span_ms=450_000)
+    hist.add(["EU"], [500_000], [500_000])
+    for t in (520_000, 480_000, 600_000, 400_000, 900_000, 100_000):
+        hist.add(["EU", "NA"], [t, t], [t - 50, t + 50])
+    hist.add(["EU"], [0], [0])  # bogus arrival: must not stretch the axis back to 0
+    counts = hist.counts
+    assert hist.total == 13 and hist.rejected == 1
+    assert counts["EU"].shape[0] == 900 - 100 + 1 and counts["EU"].sum() == 7 and counts["NA"].sum() == 6
+    assert counts["EU"][500 - 100].sum() == 1 and counts["NA"][0].sum() == 1
+    assert hist.axis.capacity < 4 * counts["EU"].shape[0]